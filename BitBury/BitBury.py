@@ -1,113 +1,959 @@
 import os
+import re
+import json
+import argparse
+import errno
+import ctypes
+import ctypes.util
+import mmap
+import stat
+import zlib
+import struct
+import hashlib
+import sqlite3
 import sys
 import time
+import tempfile
 import random
-from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QFileDialog, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, 
-    QWidget, QProgressBar, QMessageBox, QLineEdit, QComboBox
-)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from PyQt5.QtWidgets import (
+        QApplication, QMainWindow, QFileDialog, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
+        QWidget, QProgressBar, QMessageBox, QLineEdit, QComboBox
+    )
+    from PyQt5.QtCore import Qt, QThread, pyqtSignal
+except ImportError:
+    # The command line works without Qt; only the window needs it
+    QApplication = None
+    QMainWindow = QThread = object
+
+    def pyqtSignal(*types):
+        return None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not available on Windows
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None  # Random wipes fall back to the slower SHAKE-256 keystream
 
 # Constants
 TOOL_NAME = "BitBury"
 TAGLINE = "Bury the bits or bring them back!"
 SECTOR_SIZE = 512
+BLOCK_SIZE = 16 * 1024 * 1024  # Bytes of the image searched per read during recovery
+MiB = 1024 * 1024
+SHARD_SIZE = 256 * 1024 * 1024  # Largest byte range of the image scanned by one worker process
+COPY_CHUNK = 8 * 1024 * 1024  # Largest piece of a carved file held in memory when it cannot be copied in the kernel
+READERS = ('auto', 'mmap', 'buffered')
+# A 32-bit process cannot map a whole large image into its address space
+MAX_MAP_SIZE = sys.maxsize if sys.maxsize > 2 ** 32 else 1024 * 1024 * 1024
+PARSE_CHUNK = 64 * 1024  # Bytes read at a time when a parser has to search for its next structure
+WIPE_MODES = ('zeros', 'random')
+WIPE_BLOCK_SIZE = 16 * 1024 * 1024  # Bytes written per call when wiping
+CHECKPOINT_INTERVAL = 10  # Seconds between writes of a job's checkpoint file
+CATALOGUE_FILE = "catalogue.db"  # Default catalogue of a recovery, kept in its output folder
+DIRECT_ALIGNMENT = 4096  # O_DIRECT writes must be aligned to the device's logical block size, at most this
+KEYSTREAM_CHUNK = 1024 * 1024  # Bytes of the SHAKE-256 keystream derived from each counter value
+VERIFY_MODES = ('sample', 'full')
+VERIFY_SAMPLES = 64  # Blocks read back by a sampled verification
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+BLKZEROOUT = 0x127F  # Linux ioctl that zeroes a byte range of a block device, offloaded to the device where it can
 
 # File Signatures
+# max_size bounds a carve that never meets its footer; files without a footer are cut there
+# or at the next header, whichever comes first
 FILE_SIGNATURES = {
-    'jpeg': {'header': b'\xFF\xD8\xFF', 'footer': b'\xFF\xD9'},
-    'png': {'header': b'\x89\x50\x4E\x47\x0D\x0A\x1A\x0A', 'footer': b'\x49\x45\x4E\x44\xAE\x42\x60\x82'},
-    'pdf': {'header': b'\x25\x50\x44\x46', 'footer': b'\x0A\x25\x25\x45\x4F\x46'},
-    'zip': {'header': b'\x50\x4B\x03\x04'},
-    'docx': {'header': b'\x50\x4B\x03\x04', 'footer': b'\x50\x4B\x05\x06'},  # Matches DOCX footers
-    'mp4': {'header': b'\x00\x00\x00\x18\x66\x74\x79\x70', 'footer': None},  # No fixed footer
+    'jpeg': {'header': b'\xFF\xD8\xFF', 'footer': b'\xFF\xD9', 'max_size': 32 * MiB},
+    'png': {'header': b'\x89\x50\x4E\x47\x0D\x0A\x1A\x0A', 'footer': b'\x49\x45\x4E\x44\xAE\x42\x60\x82',
+            'max_size': 64 * MiB},
+    'pdf': {'header': b'\x25\x50\x44\x46', 'footer': b'\x0A\x25\x25\x45\x4F\x46', 'max_size': 256 * MiB},
+    'zip': {'header': b'\x50\x4B\x03\x04', 'max_size': 256 * MiB},
+    'docx': {'header': b'\x50\x4B\x03\x04', 'footer': b'\x50\x4B\x05\x06', 'max_size': 64 * MiB},  # Matches DOCX footers
+    'mp4': {'header': b'\x00\x00\x00\x18\x66\x74\x79\x70', 'footer': None, 'max_size': 1024 * MiB},  # No fixed footer
     'txt': {'header': None, 'footer': None},  # Plain text files don't have headers or footers
 }
 
+# Format parsers
+# Each takes the open image, the offset of a header and the furthest offset the file may reach, and
+# returns (length, file_type) of the file found there or None when the structure does not hold up.
+
+def read_at(image, offset, length):
+    image.seek(offset)
+    return image.read(length)
+
+def find_in_image(image, needle, start, end):
+    """Return the offset of the first needle in [start, end) of the image, or None."""
+    position = start
+    while position < end:
+        data = read_at(image, position, min(PARSE_CHUNK + len(needle) - 1, end - position))
+        index = data.find(needle)
+        if index != -1:
+            return position + index
+        if len(data) < len(needle):
+            return None
+        position += len(data) - len(needle) + 1
+    return None
+
+def parse_png(image, offset, limit):
+    """Walk the chunks from IHDR to IEND."""
+    position = offset + 8
+    while position + 12 <= limit:
+        header = read_at(image, position, 8)
+        if len(header) < 8:
+            return None
+        length, chunk_type = struct.unpack('>I4s', header)
+        if not chunk_type.isalpha() or position + 12 + length > limit:
+            return None
+        if position == offset + 8:
+            ihdr = read_at(image, position + 8, 17)
+            if chunk_type != b'IHDR' or length != 13 or \
+                    zlib.crc32(chunk_type + ihdr[:13]) != struct.unpack('>I', ihdr[13:])[0]:
+                return None
+        position += 12 + length
+        if chunk_type == b'IEND':
+            return position - offset, 'png'
+    return None
+
+def skip_entropy_data(image, position, limit):
+    """Return the offset of the first marker after the entropy-coded data at position, or None."""
+    while position < limit:
+        data = read_at(image, position, min(PARSE_CHUNK, limit - position))
+        if not data:
+            return None
+        index = data.find(b'\xff')
+        while index != -1 and index + 1 < len(data):
+            # 0xFF00 is an escaped data byte, 0xFFD0-0xFFD7 are restart markers and 0xFFFF is fill
+            following = data[index + 1]
+            if following not in (0x00, 0xFF) and not 0xD0 <= following <= 0xD7:
+                return position + index
+            index = data.find(b'\xff', index + 1)
+        # A 0xFF at the very end of the chunk is read again together with the byte after it
+        position += index if index > 0 else len(data)
+    return None
+
+def parse_jpeg(image, offset, limit):
+    """Walk the marker segments, skipping embedded thumbnails, until the EOI after the image data."""
+    position = offset + 2
+    scanned = False
+    while position + 2 <= limit:
+        marker = read_at(image, position, 4)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        kind = marker[1]
+        if kind == 0xFF:
+            position += 1
+        elif kind == 0xD9:
+            return (position + 2 - offset, 'jpeg') if scanned else None
+        elif 0xD0 <= kind <= 0xD7 or kind == 0x01:
+            position += 2
+        elif kind in (0x00, 0xD8) or len(marker) < 4:
+            return None
+        else:
+            length = struct.unpack('>H', marker[2:])[0]
+            if length < 2:
+                return None
+            position += 2 + length
+            if kind == 0xDA:
+                scanned = True
+                position = skip_entropy_data(image, position, limit)
+                if position is None:
+                    return None
+    return None
+
+def zip_central_directory(image, position, limit):
+    """Walk the central directory at position and return (end of the archive, member names) or None."""
+    names = []
+    signature = read_at(image, position, 4)
+    while signature == b'PK\x01\x02':
+        entry = read_at(image, position, 46)
+        if len(entry) < 46:
+            return None
+        name_length, extra_length, comment_length = struct.unpack('<3H', entry[28:34])
+        names.append(read_at(image, position + 46, name_length))
+        position += 46 + name_length + extra_length + comment_length
+        if position > limit:
+            return None
+        signature = read_at(image, position, 4)
+    if signature == b'PK\x06\x06':
+        # Zip64 end of central directory record, followed by its locator
+        field = read_at(image, position + 4, 8)
+        if len(field) < 8:
+            return None
+        record_size, = struct.unpack('<Q', field)
+        position += 12 + record_size + 20
+        if position > limit:
+            return None
+        signature = read_at(image, position, 4)
+    if signature != b'PK\x05\x06':
+        return None
+    record = read_at(image, position, 22)
+    if len(record) < 22:
+        return None
+    comment_length, = struct.unpack('<H', record[20:22])
+    end = position + 22 + comment_length
+    return (end, names) if end <= limit else None
+
+def parse_zip(image, offset, limit):
+    """Walk the local headers to the central directory and tell DOCX files from other archives.
+
+    Members written with a data descriptor do not record their size up
+    front; the archive is then found by the end of central directory record
+    that points back at offset.
+    """
+    position = offset
+    while True:
+        header = read_at(image, position, 30)
+        if len(header) < 30 or header[:4] != b'PK\x03\x04':
+            break
+        flags, = struct.unpack('<H', header[6:8])
+        compressed_size, = struct.unpack('<I', header[18:22])
+        name_length, extra_length = struct.unpack('<2H', header[26:30])
+        if flags & 0x08:
+            position = None
+            break
+        position += 30 + name_length + extra_length + compressed_size
+        if position > limit:
+            return None
+    if position is None:
+        search = offset
+        while True:
+            found = find_in_image(image, b'PK\x05\x06', search, limit)
+            if found is None:
+                return None
+            fields = read_at(image, found + 12, 8)
+            if len(fields) < 8:
+                return None
+            directory_size, directory_offset = struct.unpack('<2I', fields)
+            if found - directory_size - directory_offset == offset:
+                position = offset + directory_offset
+                break
+            search = found + 4
+    directory = zip_central_directory(image, position, limit)
+    if not directory or position == offset:
+        return None
+    end, names = directory
+    is_docx = any(name.startswith(b'word/') for name in names)
+    return end - offset, 'docx' if is_docx else 'zip'
+
+MP4_BOXES = {b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide', b'uuid', b'meta', b'moof', b'mfra',
+             b'sidx', b'styp', b'pdin', b'udta', b'emsg', b'prft'}  # Boxes found at the top level of a file
+
+def parse_mp4(image, offset, limit):
+    """Follow the top-level box sizes until something that is not a box; the file needs a movie box."""
+    position = offset
+    seen = set()
+    while position + 8 <= limit:
+        header = read_at(image, position, 16)
+        if len(header) < 8:
+            break
+        size, box_type = struct.unpack('>I4s', header[:8])
+        if box_type not in MP4_BOXES:
+            break
+        if size == 1 and len(header) == 16:
+            size, = struct.unpack('>Q', header[8:])
+        elif size == 0:
+            size = limit - position  # The last box runs to the end of the file
+        if size < 8 or position + size > limit:
+            break
+        seen.add(box_type)
+        position += size
+    if b'moov' in seen or b'moof' in seen:
+        return position - offset, 'mp4'
+    return None
+
+STARTXREF = re.compile(rb'startxref\s+(\d+)\s+%%EOF(?:\r\n|\r|\n)?')
+XREF = re.compile(rb'xref|\d+\s+\d+\s+obj')  # A cross-reference table or stream
+PDF_OBJECT = re.compile(rb'\s*\d+\s+\d+\s+obj')
+
+def parse_pdf(image, offset, limit):
+    """Follow startxref to a cross-reference section, including incremental updates appended after %%EOF."""
+    position = offset
+    end = None
+    while True:
+        found = find_in_image(image, b'startxref', position, limit)
+        if found is None:
+            break
+        position = found + 9
+        match = STARTXREF.match(read_at(image, found, 64))
+        if not match:
+            continue
+        xref = offset + int(match.group(1))
+        if xref >= found or not XREF.match(read_at(image, xref, 32)):
+            continue
+        end = position = found + match.end()
+        if not PDF_OBJECT.match(read_at(image, end, 32)):
+            break
+    return (end - offset, 'pdf') if end else None
+
+PARSERS = {'png': parse_png, 'jpeg': parse_jpeg, 'zip': parse_zip, 'docx': parse_zip, 'mp4': parse_mp4,
+           'pdf': parse_pdf}
+
+class SignatureMatcher:
+    """Finds every header and footer of FILE_SIGNATURES in a buffer in a single pass.
+
+    All signatures are compiled into one regex alternation, so each block of
+    the image is scanned once instead of once per signature and sector.
+    """
+
+    def __init__(self, file_type=None, parse=False):
+        self.headers = {}  # header bytes -> file type (the first type listed wins, e.g. zip over docx)
+        signatures = set()
+        for ftype, sig in FILE_SIGNATURES.items():
+            if file_type and file_type != ftype:
+                continue
+            if sig['header']:
+                self.headers.setdefault(sig['header'], ftype)
+                signatures.add(sig['header'])
+            # Parsed formats find their own end, so their footers need not be searched for
+            if sig.get('footer') and not (parse and ftype in PARSERS):
+                signatures.add(sig['footer'])
+        self.max_length = max(map(len, signatures), default=1)
+        # Longer signatures first, so a footer never hides a header that starts with it
+        self.regex = re.compile(b'|'.join(re.escape(s) for s in sorted(signatures, key=len, reverse=True)))
+
+    def finditer(self, buffer, limit):
+        """Yield (position, signature) for each match starting before limit."""
+        for match in self.regex.finditer(buffer):
+            if match.start() >= limit:
+                break
+            yield match.start(), match.group()
+
+class CarvingEngine:
+    """Carves files out of a disk image by their header and footer signatures.
+
+    The image is read in large blocks that overlap by the longest signature,
+    so signatures spanning a block boundary are still found. A file starts at
+    a header (only at sector boundaries when aligned is set). With parse set,
+    the format's parser in PARSERS finds its exact length, headers it rejects
+    are dropped and the scan jumps past every file it accepts. Otherwise a
+    file ends after its footer, at the next header if it has no footer, or at
+    max_size. known lists (start, end) regions carved by an earlier scan;
+    they are skipped like parsed files.
+    """
+
+    def __init__(self, file_type=None, aligned=True, block_size=BLOCK_SIZE, reader='auto', parse=True, known=()):
+        self.file_type = file_type
+        self.aligned = aligned
+        self.block_size = block_size
+        self.reader = reader
+        self.parse = parse
+        self.known = sorted(known)
+        self.matcher = SignatureMatcher(file_type, parse)
+        self.pending = None  # Start of the file being carved up to its footer, if any
+        self.skip_to = 0  # End of the last parsed file
+
+    def carve(self, image, size, on_block=None, start=0):
+        """Yield (offset, length, file_type, status) for every file found in the open image from start on.
+
+        status tells how the end was found: 'parsed' by the format's parser,
+        'footer' at its footer signature, or 'cut' at the next header, at
+        max_size or at the end of the image.
+
+        on_block is called with the offset scanned up to after every block.
+        """
+        return self.assemble(self.scan(image, start, size, on_block), size, image)
+
+    def resume_offset(self, scanned):
+        """Return where a carve stopped after scanning up to scanned can pick up again.
+
+        Every file starting before that offset has already been yielded.
+        """
+        if self.pending is not None:
+            return self.pending
+        return max(scanned, self.skip_to)
+
+    def scan(self, image, start, end, on_block=None):
+        """Yield (offset, signature) for every signature starting in [start, end) of the open image.
+
+        With the mmap reader the blocks are memoryviews straight into the
+        mapped image; otherwise they are read into one reused buffer. The
+        'auto' reader maps regular files and reads everything else. Sending
+        an offset into the generator skips ahead to it.
+        """
+        mapped = map_image(image) if self.reader != 'buffered' else None
+        if mapped is None and self.reader == 'mmap':
+            raise ValueError(f"{image.name} cannot be memory-mapped")
+        overlap = self.matcher.max_length - 1
+        if mapped is None:
+            buffer = bytearray(self.block_size + overlap)
+            view = memoryview(buffer)
+
+            def read_block(base):
+                image.seek(base)
+                return view[:image.readinto(buffer)]
+        else:
+            view = memoryview(mapped)
+
+            def read_block(base):
+                return view[base:base + self.block_size + overlap]
+        try:
+            base = start
+            while base < end:
+                with read_block(base) as block:
+                    if not len(block):
+                        break
+                    next_base = base + min(self.block_size, len(block), end - base)
+                    for position, signature in self.matcher.finditer(block, next_base - base):
+                        skip = yield base + position, signature
+                        if skip and skip >= next_base:
+                            next_base = skip
+                            break
+                base = next_base
+                if on_block:
+                    on_block(min(base, end))
+        finally:
+            # Every view into the map has to be released before it can be closed
+            view.release()
+            if mapped is not None:
+                mapped.close()
+
+    def assemble(self, hits, size, image=None):
+        """Turn signature hits, in offset order, into (offset, length, file_type, status) of carved files.
+
+        hits is a generator like scan(). Parsing needs the open image; the end
+        of each parsed file is sent back into hits so it can skip the contents.
+        """
+        current = None  # (start offset, file type) of the file being carved up to its footer
+        skip_to = 0
+        sent = None
+        known = deque(self.known)
+        while True:
+            # Kept on the engine for resume_offset, which is asked between hits
+            self.pending = current[0] if current else None
+            self.skip_to = skip_to
+            try:
+                offset, signature = hits.send(sent)
+            except StopIteration:
+                break
+            sent = None
+            if offset < skip_to:
+                continue
+            while known and known[0][1] <= offset:
+                known.popleft()
+            if not current and known and known[0][0] <= offset:
+                skip_to = sent = known[0][1]
+                continue
+            if current:
+                start, ftype = current
+                sig = FILE_SIGNATURES[ftype]
+                if offset - start > sig['max_size']:
+                    if not sig.get('footer'):
+                        yield start, sig['max_size'], ftype, 'cut'
+                    current = None
+                elif signature == sig.get('footer') and offset >= start + len(sig['header']):
+                    yield start, offset + len(signature) - start, ftype, 'footer'
+                    current = None
+                    continue
+                elif signature in self.matcher.headers and not sig.get('footer') and self._header_allowed(offset):
+                    # Without a footer, the next file's header is the best guess for the end
+                    yield start, offset - start, ftype, 'cut'
+                    current = None
+                else:
+                    continue
+            if signature not in self.matcher.headers or not self._header_allowed(offset):
+                continue
+            ftype = self.matcher.headers[signature]
+            if not (self.parse and image is not None and ftype in PARSERS):
+                current = (offset, ftype)
+                continue
+            try:
+                parsed = PARSERS[ftype](image, offset, min(size, offset + FILE_SIGNATURES[ftype]['max_size']))
+            except Exception:
+                # A damaged structure the parser did not anticipate only rejects this header, not the carve
+                parsed = None
+            if parsed:
+                length, ftype = parsed
+                # A ZIP parser result can be a plain archive when only DOCX files were asked for
+                if not self.file_type or ftype == self.file_type:
+                    yield offset, length, ftype, 'parsed'
+                skip_to = sent = offset + length
+        if current and not FILE_SIGNATURES[current[1]].get('footer'):
+            start, ftype = current
+            yield start, min(size - start, FILE_SIGNATURES[ftype]['max_size']), ftype, 'cut'
+
+    def _header_allowed(self, offset):
+        return not self.aligned or offset % SECTOR_SIZE == 0
+
+def scan_shard(engine, disk_path, start, end):
+    """Return the signature hits in [start, end) of the image. Runs in a worker process."""
+    with open(disk_path, "rb", buffering=0) as disk:
+        return list(engine.scan(disk, start, end))
+
+def carve_parallel(engine, disk_path, size, workers=None, shard_size=None, on_block=None, start=0):
+    """Yield (offset, length, file_type, status) like engine.carve, scanning shards in a process pool.
+
+    A shard reads past its end by the overlap but only reports signatures
+    starting inside it, so a hit on a shard boundary is found exactly once.
+    The hits are assembled in offset order here, so files spanning several
+    shards come out whole and the result matches a serial carve. on_block is
+    called with the end of each shard once its hits have been assembled.
+    At most two shards per worker are in flight; the next shard is only
+    submitted as one is consumed, so memory does not grow with the image
+    when copying out files falls behind the scan.
+    """
+    workers = workers or os.cpu_count() or 1
+    if not shard_size:
+        # Several shards per worker keep every process busy until the end
+        shard_size = max(engine.block_size, min(SHARD_SIZE, -(-size // (workers * 4))))
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(disk_path, "rb", buffering=0) as disk:
+        shards = iter(range(start, size, shard_size))
+        pending = deque()
+
+        def submit_next():
+            offset = next(shards, None)
+            if offset is not None:
+                end = min(offset + shard_size, size)
+                pending.append((executor.submit(scan_shard, engine, disk_path, offset, end), end))
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        def hits():
+            while pending:
+                # Drop each shard's hits once they have been assembled; skipping is left to assemble
+                future, end = pending.popleft()
+                submit_next()
+                for hit in future.result():
+                    yield hit
+                if on_block:
+                    on_block(end)
+
+        yield from engine.assemble(hits(), size, disk)
+
+def copy_extent(src_fd, dst_fd, offset, length):
+    """Copy length bytes at offset of src_fd to the current position of dst_fd.
+
+    Uses copy_file_range or sendfile so the data never passes through Python
+    (and can be reflinked by the filesystem), falling back to reads of at
+    most COPY_CHUNK bytes. Memory use does not depend on the size of the extent.
+    """
+    end = offset + length
+    for kernel_copy in ('copy_file_range', 'sendfile'):
+        if not hasattr(os, kernel_copy):
+            continue
+        try:
+            while offset < end:
+                if kernel_copy == 'copy_file_range':
+                    copied = os.copy_file_range(src_fd, dst_fd, end - offset, offset)
+                else:
+                    copied = os.sendfile(dst_fd, src_fd, offset, end - offset)
+                if not copied:
+                    return
+                offset += copied
+            return
+        except OSError:
+            # Not supported between these files (e.g. block device source or old kernel)
+            continue
+    while offset < end:
+        os.lseek(src_fd, offset, os.SEEK_SET)
+        data = os.read(src_fd, min(COPY_CHUNK, end - offset))
+        if not data:
+            return
+        written = 0
+        while written < len(data):
+            written += os.write(dst_fd, data[written:])
+        offset += len(data)
+
+def map_image(image):
+    """Return a read-only mmap of the open image, or None for block devices and images too large to map."""
+    if not stat.S_ISREG(os.fstat(image.fileno()).st_mode):
+        return None
+    size = image_size(image)
+    if not size or size > MAX_MAP_SIZE:
+        return None
+    try:
+        return mmap.mmap(image.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, OverflowError):
+        return None
+
+def image_size(image):
+    """Return the size of an open image file or block device."""
+    return os.lseek(image.fileno(), 0, os.SEEK_END)
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Catalogue:
+    """SQLite index of the files carved from each image.
+
+    Every carved file is recorded with its offset and length in the image,
+    its type, SHA-256 and validation status (see CarvingEngine.carve). A
+    repeat scan of the same image skips the regions already carved, and
+    extract_files() writes catalogued files out again straight from the
+    image without scanning it.
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS carved ("
+            "image TEXT, image_size INTEGER, offset INTEGER, length INTEGER NOT NULL, type TEXT NOT NULL, "
+            "sha256 TEXT NOT NULL, status TEXT NOT NULL, file_name TEXT NOT NULL, "
+            "PRIMARY KEY (image, image_size, offset))")
+
+    @staticmethod
+    def key(disk_path, size):
+        return os.path.abspath(disk_path), size
+
+    def add(self, disk_path, size, offset, length, ftype, sha256, status, file_name):
+        self.conn.execute("INSERT OR REPLACE INTO carved VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                          (*self.key(disk_path, size), offset, length, ftype, sha256, status, file_name))
+        self.conn.commit()
+
+    def regions(self, disk_path, size):
+        """Return the (start, end) byte ranges already carved from this image."""
+        return self.conn.execute(
+            "SELECT offset, offset + length FROM carved WHERE image=? AND image_size=? ORDER BY offset",
+            self.key(disk_path, size)).fetchall()
+
+    def entries(self, file_type=None, offsets=None):
+        """Return (image, offset, length, type, sha256, status, file_name) of catalogued files."""
+        rows = self.conn.execute(
+            "SELECT image, offset, length, type, sha256, status, file_name FROM carved ORDER BY image, offset")
+        return [row for row in rows if (not file_type or row[3] == file_type) and (not offsets or row[1] in offsets)]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM carved").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+def recover_files(disk_path, output_folder, file_type=None, aligned=True, block_size=BLOCK_SIZE,
+                  reader='auto', workers=1, parse=True, start=0, first_index=0, checkpoint=None,
+                  catalogue=None, message=print, progress=None):
+    """Carve files from disk_path into output_folder and return how many were recovered in this run.
+
+    With workers other than 1 the image is scanned in a process pool
+    (workers=None uses every CPU). An interrupted recovery continues from
+    start, numbering files from first_index. checkpoint is called with
+    (offset, files) after every block, giving the start and first_index
+    to resume with. Each file is recorded in catalogue, if given, and the
+    regions it already holds for this image are not carved again. File
+    numbers continue after the files already in the catalogue, so a repeat
+    scan into the same folder does not overwrite them.
+    """
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    file_index = max(first_index, catalogue.count()) if catalogue else first_index
+    recovered = 0
+    message(f"Starting recovery from {disk_path}...")
+    # Unbuffered, because copy_extent moves the file position behind the reader's back
+    with open(disk_path, "rb", buffering=0) as disk:
+        size = image_size(disk)
+        known = catalogue.regions(disk_path, size) if catalogue else ()
+        if known:
+            message(f"Skipping {len(known)} files already in the catalogue.")
+        engine = CarvingEngine(file_type, aligned, block_size, reader, parse, known)
+
+        def on_block(scanned):
+            if progress:
+                progress(int(scanned * 100 / size))
+            if checkpoint:
+                checkpoint(engine.resume_offset(scanned), file_index)
+
+        if workers == 1:
+            carved = engine.carve(disk, size, on_block, start)
+        else:
+            carved = carve_parallel(engine, disk_path, size, workers, on_block=on_block, start=start)
+        for offset, length, ftype, status in carved:
+            message(f"Found {ftype.upper()} file at offset {offset}.")
+            file_name = os.path.join(output_folder, f"recovered_{file_index}.{ftype}")
+            with open(file_name, "wb") as recovered_file:
+                copy_extent(disk.fileno(), recovered_file.fileno(), offset, length)
+            if catalogue:
+                catalogue.add(disk_path, size, offset, length, ftype, file_sha256(file_name), status, file_name)
+            message(f"Recovered file saved as {file_name}")
+            file_index += 1
+            recovered += 1
+    message(f"Recovery completed. {recovered} files recovered.")
+    return recovered
+
+def extract_files(catalogue, output_folder, file_type=None, offsets=None, message=print):
+    """Copy catalogued files out of their images into output_folder and return how many match their hash.
+
+    Nothing is scanned: each file is read from its recorded offset and
+    length, and checked against the SHA-256 taken when it was carved.
+    """
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    matched = 0
+    for image, offset, length, ftype, sha256, status, file_name in catalogue.entries(file_type, offsets):
+        output_name = os.path.join(output_folder, os.path.basename(file_name))
+        with open(image, "rb", buffering=0) as disk, open(output_name, "wb") as extracted_file:
+            copy_extent(disk.fileno(), extracted_file.fileno(), offset, length)
+        if file_sha256(output_name) == sha256:
+            matched += 1
+            message(f"Extracted {ftype.upper()} file at offset {offset} of {image} to {output_name}")
+        else:
+            message(f"Extracted {output_name}, but it no longer matches its hash: {image} has changed")
+    message(f"Extraction completed. {matched} files match the catalogue.")
+    return matched
+
+class Keystream:
+    """Seekable pseudorandom byte stream used by the random wipe mode.
+
+    AES-256-CTR when the cryptography package is installed, SHAKE-256 of the
+    key and a counter otherwise. The same key gives the same bytes at any
+    offset, so a random pass can be read back and checked.
+    """
+
+    def __init__(self, key=None):
+        self.key = key or os.urandom(32)
+        self.zeros = b''
+
+    def fill(self, view, offset):
+        """Fill the writable buffer view with the stream bytes starting at offset."""
+        end = offset + len(view)
+        position = offset
+        while position < end:
+            if Cipher:
+                counter, skip = divmod(position, 16)
+                length = end - position
+                if len(self.zeros) < skip + length:
+                    self.zeros = bytes(skip + length)
+                encryptor = Cipher(algorithms.AES(self.key), modes.CTR(counter.to_bytes(16, 'big'))).encryptor()
+                data = encryptor.update(memoryview(self.zeros)[:skip + length])
+            else:
+                counter, skip = divmod(position, KEYSTREAM_CHUNK)
+                length = min(KEYSTREAM_CHUNK - skip, end - position)
+                data = hashlib.shake_256(self.key + counter.to_bytes(8, 'little')).digest(skip + length)
+            view[position - offset:position - offset + length] = memoryview(data)[skip:]
+            position += length
+
+def open_target(disk_path, direct=False):
+    """Open disk_path for writing in place: never created or truncated, so it keeps its size."""
+    flags = os.O_WRONLY | getattr(os, 'O_BINARY', 0)
+    if direct:
+        if not hasattr(os, 'O_DIRECT'):
+            raise ValueError("O_DIRECT is not supported on this platform")
+        flags |= os.O_DIRECT
+    return os.open(disk_path, flags)
+
+def write_at(fd, view, offset):
+    """Write all of view at offset of fd."""
+    os.lseek(fd, offset, os.SEEK_SET)
+    written = 0
+    while written < len(view):
+        written += os.write(fd, view[written:])
+
+def zero_fast(fd, size):
+    """Zero all size bytes of fd without writing them, raising OSError where this is not supported.
+
+    A block device gets BLKZEROOUT, which reads back as zeros. A regular file
+    gets a hole punched through it, which frees its blocks in the filesystem
+    without overwriting them.
+    """
+    if stat.S_ISBLK(os.fstat(fd).st_mode):
+        if not fcntl:
+            raise OSError(errno.EOPNOTSUPP, "BLKZEROOUT is not supported on this platform")
+        fcntl.ioctl(fd, BLKZEROOUT, struct.pack('QQ', 0, size))
+        return
+    library = ctypes.util.find_library('c')
+    libc = ctypes.CDLL(library, use_errno=True) if library else None
+    if not libc or not hasattr(libc, 'fallocate'):
+        raise OSError(errno.EOPNOTSUPP, "fallocate is not supported on this platform")
+    libc.fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+    if libc.fallocate(fd, FALLOC_FL_PUNCH_HOLE | FALLOC_FL_KEEP_SIZE, 0, size) != 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+
+def verify_wipe(disk_path, keystream=None, method="full", block_size=WIPE_BLOCK_SIZE, progress=None):
+    """Read disk_path back and return the offsets of blocks that do not hold the wiped pattern.
+
+    The pattern is zeros, or the keystream of the last random pass. 'sample'
+    checks VERIFY_SAMPLES random blocks and 'full' checks every block. The
+    page cache is dropped first where possible, so the data comes from the
+    device rather than from memory.
+    """
+    if method not in VERIFY_MODES:
+        raise ValueError(f"Unknown verification method {method!r}")
+    buffer = bytearray(block_size)
+    expected = bytearray(block_size)
+    mismatches = []
+    with open(disk_path, "rb", buffering=0) as disk:
+        size = image_size(disk)
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(disk.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        offsets = range(0, size, block_size)
+        if method == "sample":
+            offsets = sorted(random.sample(offsets, min(VERIFY_SAMPLES, len(offsets))))
+        for count, offset in enumerate(offsets, 1):
+            length = min(block_size, size - offset)
+            disk.seek(offset)
+            read = disk.readinto(buffer)
+            if keystream:
+                keystream.fill(memoryview(expected)[:length], offset)
+            # Whole bytearrays compare with memcmp; only a short last block needs slicing
+            if read < length or (buffer != expected if length == block_size else
+                                 buffer[:length] != expected[:length]):
+                mismatches.append(offset)
+            if progress:
+                progress(int(count * 100 / len(offsets)))
+    return mismatches
+
+def wipe_disk(disk_path, mode="zeros", passes=1, block_size=WIPE_BLOCK_SIZE, direct=False, verify=None,
+              discard=False, start_pass=0, start_offset=0, key=None, checkpoint=None, message=print,
+              progress=None):
+    """Overwrite every byte of disk_path passes times and return the number of bytes written.
+
+    One block_size buffer is reused for every write. It comes from mmap, so it
+    is page aligned as O_DIRECT requires. Random passes each use a fresh
+    Keystream, and progress is reported as a percentage of all passes.
+    With discard, a zero wipe first tries zero_fast and only writes if that
+    is not supported. With verify ('sample' or 'full'), the result is read
+    back afterwards and a RuntimeError is raised if any block differs.
+
+    An interrupted wipe continues at start_offset of pass start_pass, with
+    the keystream key that pass was using. checkpoint is called with
+    (pass, offset, key) after every block, giving the values to resume with.
+    """
+    if mode not in WIPE_MODES:
+        raise ValueError(f"Unknown wipe mode {mode!r}")
+    if direct and block_size % DIRECT_ALIGNMENT:
+        raise ValueError(f"The block size must be a multiple of {DIRECT_ALIGNMENT} bytes for O_DIRECT")
+    fd = open_target(disk_path, direct)
+    buffer = mmap.mmap(-1, block_size)
+    view = memoryview(buffer)
+    total = 0
+    keystream = None
+    try:
+        size = os.lseek(fd, 0, os.SEEK_END)
+        if discard and mode == "zeros":
+            try:
+                zero_fast(fd, size)
+                os.fsync(fd)
+                passes = 0
+                message(f"Zeroed {size} bytes without writing them.")
+                if progress:
+                    progress(100)
+            except OSError as e:
+                message(f"Fast zeroing is not available ({e}), writing zeros instead.")
+        for p in range(start_pass, passes):
+            message(f"Pass {p + 1} of {passes} starting...")
+            keystream = Keystream(key if p == start_pass else None) if mode == "random" else None
+            offset = start_offset if p == start_pass else 0
+            while offset < size:
+                length = min(block_size, size - offset)
+                buffered_tail = direct and length % DIRECT_ALIGNMENT and fcntl
+                if buffered_tail:
+                    # O_DIRECT cannot write a partial block, so the tail goes through the page cache
+                    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+                    fcntl.fcntl(fd, fcntl.F_SETFL, flags & ~os.O_DIRECT)
+                if keystream:
+                    keystream.fill(view[:length], offset)
+                write_at(fd, view[:length], offset)
+                if buffered_tail:
+                    fcntl.fcntl(fd, fcntl.F_SETFL, flags)  # Later passes write with O_DIRECT again
+                offset += length
+                total += length
+                if progress:
+                    progress(int((p * size + offset) * 100 / (passes * size)))
+                if checkpoint:
+                    checkpoint(p, offset, keystream.key if keystream else None)
+            os.fsync(fd)
+            message(f"Pass {p + 1} completed.")
+    finally:
+        view.release()
+        buffer.close()
+        os.close(fd)
+    message("Disk wipe completed.")
+    if verify:
+        message("Verifying the wipe...")
+        mismatches = verify_wipe(disk_path, keystream, verify, block_size, progress)
+        if mismatches:
+            raise RuntimeError(f"Verification failed: {len(mismatches)} blocks were not wiped, "
+                               f"the first at offset {mismatches[0]}")
+        message("Verification passed.")
+    return total
+
+def check_wipe(folder='.', size=3 * MiB + 1000, passes=2, block_size=MiB, message=print):
+    """Wipe temporary regular files in folder in every mode and check each with verify_wipe.
+
+    The size is not a multiple of DIRECT_ALIGNMENT, so the O_DIRECT runs
+    also cover the buffered tail. Raises AssertionError if a block was not
+    wiped or a file changed size. O_DIRECT runs are skipped, with a message,
+    where the file system does not support it (tmpfs, for one).
+    """
+    quiet = lambda text: None
+    with tempfile.TemporaryDirectory(prefix='bitbury_check_', dir=folder) as temp_folder:
+        path = os.path.join(temp_folder, 'target.img')
+        for mode in WIPE_MODES:
+            for direct in (False, True):
+                with open(path, 'wb') as target:
+                    target.write(os.urandom(size))
+                keys = []
+                try:
+                    wipe_disk(path, mode, passes, block_size, direct, message=quiet,
+                              checkpoint=lambda pass_, offset, key: keys.append(key))
+                except OSError as e:
+                    if direct and e.errno == errno.EINVAL:
+                        message(f"{mode:<7} direct  skipped: O_DIRECT is not supported in {folder}")
+                        continue
+                    raise
+                keystream = Keystream(keys[-1]) if mode == "random" else None
+                assert os.path.getsize(path) == size, f"{mode} wipe changed the size to {os.path.getsize(path)}"
+                assert verify_wipe(path, keystream, "full", block_size) == [], f"{mode} wipe left blocks unwiped"
+                message(f"{mode:<7} {'direct' if direct else 'cached':<7} {passes} passes over {size} bytes: verified")
+    message("Wipe check passed.")
+
 class FileRecoveryWorker(QThread):
     progress = pyqtSignal(int)
     message = pyqtSignal(str)
 
-    def __init__(self, disk_path, output_folder, file_type=None):
+    def __init__(self, disk_path, output_folder, file_type=None, aligned=True, reader='auto', workers=1):
         super().__init__()
         self.disk_path = disk_path
         self.output_folder = output_folder
         self.file_type = file_type
+        self.aligned = aligned
+        self.reader = reader
+        self.workers = workers
 
     def run(self):
-        if not os.path.exists(self.output_folder):
-            os.makedirs(self.output_folder)
-
-        file_counter = 0
-        inside_file = False
-        current_file_data = b""
-        file_type = None
-
-        self.message.emit(f"Starting recovery from {self.disk_path}...")
-        with open(self.disk_path, "rb") as disk:
-            while True:
-                sector = disk.read(SECTOR_SIZE)
-                if not sector:
-                    break
-
-                # Check for file headers
-                if not inside_file:
-                    for ftype, sig in FILE_SIGNATURES.items():
-                        if self.file_type and self.file_type != ftype:
-                            continue
-                        if sig['header'] and sector.startswith(sig['header']):
-                            self.message.emit(f"Found {ftype.upper()} file header.")
-                            current_file_data = sector
-                            inside_file = True
-                            file_type = ftype
-                            break
-
-                # Continue reading file content
-                elif inside_file:
-                    current_file_data += sector
-                    if file_type in FILE_SIGNATURES and 'footer' in FILE_SIGNATURES[file_type]:
-                        if FILE_SIGNATURES[file_type]['footer'] and FILE_SIGNATURES[file_type]['footer'] in sector:
-                            footer_index = sector.index(FILE_SIGNATURES[file_type]['footer']) + len(FILE_SIGNATURES[file_type]['footer'])
-                            current_file_data = current_file_data[:footer_index]
-                            inside_file = False
-
-                            file_name = os.path.join(self.output_folder, f"recovered_{file_counter}.{file_type}")
-                            with open(file_name, "wb") as recovered_file:
-                                recovered_file.write(current_file_data)
-                            self.message.emit(f"Recovered file saved as {file_name}")
-                            file_counter += 1
-                            current_file_data = b""
-                            file_type = None
-
-            self.message.emit(f"Recovery completed. {file_counter} files recovered.")
+        catalogue = None
+        try:
+            os.makedirs(self.output_folder, exist_ok=True)
+            catalogue = Catalogue(os.path.join(self.output_folder, CATALOGUE_FILE))
+            recover_files(self.disk_path, self.output_folder, self.file_type, self.aligned, reader=self.reader,
+                          workers=self.workers, catalogue=catalogue, message=self.message.emit,
+                          progress=self.progress.emit)
+        except PermissionError:
+            self.message.emit("Permission denied. Run as administrator/root.")
+        except Exception as e:
+            self.message.emit(f"Error: {e}")
+        finally:
+            if catalogue:
+                catalogue.close()
 
 class DiskWipeWorker(QThread):
     progress = pyqtSignal(int)
     message = pyqtSignal(str)
 
-    def __init__(self, disk_path, mode="zeros", passes=1):
+    def __init__(self, disk_path, mode="zeros", passes=1, direct=False, verify=None, discard=False):
         super().__init__()
         self.disk_path = disk_path
         self.mode = mode
         self.passes = passes
+        self.direct = direct
+        self.verify = verify
+        self.discard = discard
 
     def run(self):
         try:
-            for p in range(self.passes):
-                self.message.emit(f"Pass {p + 1} of {self.passes} starting...")
-                with open(self.disk_path, "wb") as disk:
-                    count = 0
-                    while True:
-                        data = os.urandom(SECTOR_SIZE) if self.mode == "random" else b'\x00' * SECTOR_SIZE
-                        try:
-                            disk.write(data)
-                            count += 1
-                            if count % 1000 == 0:
-                                self.progress.emit(count * SECTOR_SIZE)
-                        except Exception as e:
-                            break
-                self.message.emit(f"Pass {p + 1} completed.")
-            self.message.emit("Disk wipe completed.")
+            wipe_disk(self.disk_path, self.mode, self.passes, direct=self.direct, verify=self.verify,
+                      discard=self.discard, message=self.message.emit, progress=self.progress.emit)
         except PermissionError:
             self.message.emit("Permission denied. Run as administrator/root.")
         except Exception as e:
@@ -142,13 +988,23 @@ class BitBuryApp(QMainWindow):
         layout.addLayout(disk_layout)
 
         # Action buttons
+        wipe_layout = QHBoxLayout()
+        self.wipeMode = QComboBox()
+        self.wipeMode.addItems(WIPE_MODES)
+        wipe_layout.addWidget(self.wipeMode)
         wipe_button = QPushButton("Wipe Disk")
         wipe_button.clicked.connect(self.wipeDisk)
-        layout.addWidget(wipe_button)
+        wipe_layout.addWidget(wipe_button)
+        layout.addLayout(wipe_layout)
 
+        recover_layout = QHBoxLayout()
+        self.fileType = QComboBox()
+        self.fileType.addItems(["all"] + [ftype for ftype, sig in FILE_SIGNATURES.items() if sig['header']])
+        recover_layout.addWidget(self.fileType)
         recover_button = QPushButton("Recover Files")
         recover_button.clicked.connect(self.recoverFiles)
-        layout.addWidget(recover_button)
+        recover_layout.addWidget(recover_button)
+        layout.addLayout(recover_layout)
 
         # Output widget
         self.output = QLabel("")
@@ -171,24 +1027,244 @@ class BitBuryApp(QMainWindow):
         if not disk_path:
             self.showError("Please specify a disk path.")
             return
+        answer = QMessageBox.warning(self, "Wipe Disk", f"This will permanently erase all data on {disk_path}. Continue?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if answer != QMessageBox.Yes:
+            return
         # Start wiping
         self.output.setText("Starting disk wipe...")
         self.progressBar.setValue(0)
+        self.startWorker(DiskWipeWorker(disk_path, self.wipeMode.currentText()))
 
     def recoverFiles(self):
         disk_path = self.diskInput.text()
         if not disk_path:
             self.showError("Please specify a disk path.")
             return
+        output_folder = QFileDialog.getExistingDirectory(self, "Select Output Folder", "recovered_files")
+        if not output_folder:
+            return
+        file_type = self.fileType.currentText()
         # Start recovery
         self.output.setText("Starting file recovery...")
         self.progressBar.setValue(0)
+        self.startWorker(FileRecoveryWorker(disk_path, output_folder, None if file_type == "all" else file_type))
+
+    def startWorker(self, worker):
+        # Keep a reference, or the thread is destroyed while it runs
+        self.worker = worker
+        worker.progress.connect(self.progressBar.setValue)
+        worker.message.connect(self.output.setText)
+        worker.start()
 
     def showError(self, message):
         QMessageBox.critical(self, "Error", message)
 
-if __name__ == "__main__":
+class Checkpoint:
+    """A JSON file recording how far a job got, so an interrupted job can resume from there."""
+
+    def __init__(self, path, settings, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.settings = settings
+        self.interval = interval
+        self.state = None
+        self.saved = 0.0
+
+    def load(self):
+        """Return the saved progress of this job, or None to start from the beginning."""
+        try:
+            with open(self.path) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return None
+        if checkpoint.get('settings') != self.settings:
+            raise ValueError(f"{self.path} belongs to a different job; remove it to start over")
+        return checkpoint['progress']
+
+    def update(self, progress):
+        """Record the latest progress, writing it out at most every interval seconds."""
+        self.state = progress
+        if time.monotonic() - self.saved >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self.state is None:
+            return
+        # Written to a temporary file first, so an interruption never leaves half a checkpoint
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'settings': self.settings, 'progress': self.state}, f, indent=2)
+        os.replace(temp_path, self.path)
+        self.saved = time.monotonic()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def print_progress(percent):
+    print(f"\rProgress: {percent}%", end="", flush=True)
+
+def print_message(text):
+    # Clear the progress line first; the next progress update redraws it below the message
+    print(f"\r\033[K{text}")
+
+def run_recover(args):
+    settings = {'job': 'recover', 'disk': os.path.abspath(args.disk), 'output': os.path.abspath(args.output),
+                'type': args.type, 'aligned': not args.unaligned, 'parse': not args.no_parse}
+    checkpoint = Checkpoint(args.checkpoint, settings) if args.checkpoint else None
+    resume = (checkpoint.load() if checkpoint else None) or {'offset': 0, 'files': 0}
+    if resume['offset']:
+        print(f"Resuming from offset {resume['offset']} with {resume['files']} files already recovered.")
+
+    def save(offset, files):
+        checkpoint.update({'offset': offset, 'files': files})
+
+    catalogue = None
+    if not args.no_catalogue:
+        os.makedirs(args.output, exist_ok=True)
+        catalogue = Catalogue(args.catalogue or os.path.join(args.output, CATALOGUE_FILE))
+    try:
+        recover_files(args.disk, args.output, args.type, not args.unaligned, reader=args.reader,
+                      workers=args.workers, parse=not args.no_parse, start=resume['offset'],
+                      first_index=resume['files'], checkpoint=save if checkpoint else None,
+                      catalogue=catalogue, message=print_message, progress=print_progress)
+    except KeyboardInterrupt:
+        if checkpoint:
+            checkpoint.flush()
+            print(f"\nInterrupted. Run the same command again to resume from {args.checkpoint}.")
+        return 1
+    finally:
+        if catalogue:
+            catalogue.close()
+    if checkpoint:
+        checkpoint.clear()
+    return 0
+
+def run_extract(args):
+    if not os.path.exists(args.catalogue):
+        print(f"No catalogue at {args.catalogue}")
+        return 1
+    catalogue = Catalogue(args.catalogue)
+    try:
+        entries = catalogue.entries(args.type, set(args.offset or ()))
+        if args.list:
+            for image, offset, length, ftype, sha256, status, file_name in entries:
+                print(f"{image} {offset:>14} {length:>12} {ftype:<5} {status:<7} {sha256[:16]} {file_name}")
+            return 0
+        matched = extract_files(catalogue, args.output, args.type, set(args.offset or ()))
+        return 0 if matched == len(entries) else 1
+    finally:
+        catalogue.close()
+
+def run_wipe(args):
+    if not args.yes:
+        answer = input(f"This will permanently erase all data on {args.disk}. Type YES to continue: ")
+        if answer != "YES":
+            print("Wipe cancelled.")
+            return 1
+    settings = {'job': 'wipe', 'disk': os.path.abspath(args.disk), 'mode': args.mode, 'passes': args.passes}
+    checkpoint = Checkpoint(args.checkpoint, settings) if args.checkpoint else None
+    resume = (checkpoint.load() if checkpoint else None) or {'pass': 0, 'offset': 0, 'key': None}
+    if resume['pass'] or resume['offset']:
+        print(f"Resuming pass {resume['pass'] + 1} at offset {resume['offset']}.")
+
+    def save(p, offset, key):
+        # The key is saved so the rest of a random pass continues the same keystream for --verify
+        checkpoint.update({'pass': p, 'offset': offset, 'key': key.hex() if key else None})
+
+    try:
+        wipe_disk(args.disk, args.mode, args.passes, direct=args.direct, verify=args.verify, discard=args.discard,
+                  start_pass=resume['pass'], start_offset=resume['offset'],
+                  key=bytes.fromhex(resume['key']) if resume['key'] else None,
+                  checkpoint=save if checkpoint else None, message=print_message, progress=print_progress)
+    except KeyboardInterrupt:
+        if checkpoint:
+            checkpoint.flush()
+            print(f"\nInterrupted. Run the same command again to resume from {args.checkpoint}.")
+        return 1
+    except PermissionError:
+        print("\nPermission denied. Run as administrator/root.")
+        return 1
+    except RuntimeError as e:
+        print(f"\n{e}")
+        return 1
+    if checkpoint:
+        checkpoint.clear()
+    return 0
+
+def run_check_wipe(args):
+    try:
+        check_wipe(args.dir, args.size, args.passes)
+    except AssertionError as e:
+        print(f"Wipe check failed: {e}")
+        return 1
+    return 0
+
+def run_gui():
+    if QApplication is None:
+        print("The BitBury window needs PyQt5. Install it, or use the recover and wipe commands.")
+        return 1
     app = QApplication(sys.argv)
     window = BitBuryApp()
     window.show()
-    sys.exit(app.exec_())
+    return app.exec_()
+
+def main():
+    parser = argparse.ArgumentParser(description=f"{TOOL_NAME} - {TAGLINE} Without a command, the window opens.")
+    commands = parser.add_subparsers(dest='command')
+
+    recover = commands.add_parser('recover', help='Carve files out of a disk or image')
+    recover.add_argument('disk', help='Disk or image to recover from (e.g. /dev/sdb, disk.img)')
+    recover.add_argument('-o', '--output', default='recovered_files', help='Folder for the recovered files')
+    recover.add_argument('--type', choices=[ftype for ftype, sig in FILE_SIGNATURES.items() if sig['header']],
+                         help='Only recover this file type')
+    recover.add_argument('--unaligned', action='store_true', help='Look for files at every byte, not only at sectors')
+    recover.add_argument('--no-parse', action='store_true',
+                         help='End files at their footer signature instead of parsing their structure')
+    recover.add_argument('--workers', type=int, default=1, help='Processes scanning the image (0 uses every CPU)')
+    recover.add_argument('--reader', choices=READERS, default='auto', help='How the image is read')
+    recover.add_argument('--checkpoint', metavar='PATH',
+                         help='Save progress here and resume from it if the job was interrupted')
+    recover.add_argument('--catalogue', metavar='PATH',
+                         help=f'Catalogue of carved files (default: {CATALOGUE_FILE} in the output folder)')
+    recover.add_argument('--no-catalogue', action='store_true', help='Do not record or skip already carved files')
+
+    extract = commands.add_parser('extract', help='Copy catalogued files out of their images again, without scanning')
+    extract.add_argument('catalogue', help='Catalogue written by recover')
+    extract.add_argument('-o', '--output', default='extracted_files', help='Folder for the extracted files')
+    extract.add_argument('--type', help='Only extract files of this type')
+    extract.add_argument('--offset', type=int, nargs='+', help='Only extract the files at these offsets')
+    extract.add_argument('--list', action='store_true', help='List the catalogued files instead of extracting them')
+
+    wipe = commands.add_parser('wipe', help='Overwrite a disk or image')
+    wipe.add_argument('disk', help='Disk or image to wipe')
+    wipe.add_argument('--mode', choices=WIPE_MODES, default='zeros', help='What to write')
+    wipe.add_argument('--passes', type=int, default=1, help='How many times to overwrite the target')
+    wipe.add_argument('--direct', action='store_true', help='Bypass the page cache with O_DIRECT')
+    wipe.add_argument('--verify', choices=VERIFY_MODES, help='Read the target back afterwards')
+    wipe.add_argument('--discard', action='store_true',
+                      help='Zero without writing (hole punch or BLKZEROOUT) where supported')
+    wipe.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+    wipe.add_argument('--checkpoint', metavar='PATH',
+                      help='Save progress here and resume from it if the job was interrupted')
+
+    check = commands.add_parser('check-wipe', help='Wipe temporary files in every mode and verify the result')
+    check.add_argument('--dir', default='.', help='Folder for the temporary files (tmpfs does not support O_DIRECT)')
+    check.add_argument('--size', type=int, default=3 * MiB + 1000, help='Size of each file; keep it unaligned')
+    check.add_argument('--passes', type=int, default=2, help='Passes per wipe')
+
+    args = parser.parse_args()
+    if args.command == 'recover':
+        if args.workers == 0:
+            args.workers = None
+        return run_recover(args)
+    if args.command == 'wipe':
+        return run_wipe(args)
+    if args.command == 'extract':
+        return run_extract(args)
+    if args.command == 'check-wipe':
+        return run_check_wipe(args)
+    return run_gui()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import os
+import io
+import json
+import zlib
+import struct
+import time
+import random
+import zipfile
+import argparse
+import platform
+import tempfile
+import BitBury
+
+def png_chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+def sample_files(rng):
+    """Return small, structurally valid files of each carvable type, built by hand so no encoder is needed."""
+    png = (b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', struct.pack('>2I5B', 16, 16, 8, 2, 0, 0, 0)) +
+           png_chunk(b'IDAT', zlib.compress(rng.randbytes(16 * 49))) + png_chunk(b'IEND', b''))
+    scan_data = rng.randbytes(4096).replace(b'\xff', b'\x00')
+    jpeg = (b'\xff\xd8' + b'\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00' +
+            b'\xff\xda\x00\x08\x01\x01\x00\x00\x3f\x00' + scan_data + b'\xff\xd9')
+    body = b'%PDF-1.4\n1 0 obj\n<< /Type /Catalog >>\nendobj\n'
+    pdf = body + (b'xref\n0 2\n0000000000 65535 f \n0000000009 00000 n \n'
+                  b'trailer\n<< /Size 2 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % len(body))
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('data.bin', rng.randbytes(4096))
+    return [png, jpeg, pdf, archive.getvalue()]
+
+def make_synthetic_image(image_path, image_size=512 * 1024 * 1024, num_files=200, seed=0):
+    """Write image_size bytes of random data to image_path with num_files sample files at sector boundaries."""
+    rng = random.Random(seed)
+    samples = sample_files(rng)
+    offsets = sorted(rng.randrange(0, image_size - 8192, BitBury.SECTOR_SIZE) for _ in range(num_files))
+    with open(image_path, 'wb') as image:
+        written = 0
+        while written < image_size:
+            chunk = rng.randbytes(min(BitBury.BLOCK_SIZE, image_size - written))
+            image.write(chunk)
+            written += len(chunk)
+        for offset in offsets:
+            image.seek(offset)
+            image.write(rng.choice(samples))
+    return image_path
+
+def bench_readers(image_path, readers=('buffered', 'mmap'), block_sizes=(BitBury.BLOCK_SIZE,)):
+    """Time the signature search of each reader and block size and return {name: bytes per second}.
+
+    Only the search is timed; nothing is written out. All runs must find the
+    same signatures; a mismatch raises an error.
+    """
+    results = {}
+    expected = None
+    with open(image_path, 'rb', buffering=0) as image:
+        size = BitBury.image_size(image)
+        for block_size in block_sizes:
+            for reader in readers:
+                name = f"{reader} {block_size // BitBury.MiB} MiB"
+                engine = BitBury.CarvingEngine(block_size=block_size, reader=reader)
+                started = time.perf_counter()
+                hits = list(engine.scan(image, 0, size))
+                elapsed = time.perf_counter() - started
+                if expected is None:
+                    expected = hits
+                elif hits != expected:
+                    raise RuntimeError(f"{name} found different signatures than the first run")
+                results[name] = size / elapsed if elapsed else 0.0
+                print(f"{name:<16} {size / BitBury.MiB:8.1f} MiB in {elapsed:6.2f} s  "
+                      f"{results[name] / BitBury.MiB:8.1f} MiB/s  ({len(hits)} signatures)")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the mmap and buffered readers of the BitBury carver.")
+    parser.add_argument('--size', type=int, default=512, help='Size of the generated image in MiB')
+    parser.add_argument('--files', type=int, default=200, help='Number of sample files placed in the image')
+    parser.add_argument('--block-size', type=int, nargs='+', default=[BitBury.BLOCK_SIZE // BitBury.MiB],
+                        help='Block sizes to try, in MiB')
+    parser.add_argument('--image', help='Existing image to benchmark instead of a generated one')
+    parser.add_argument('--json', metavar='PATH', help='Also write the results to a JSON file to compare runs')
+    args = parser.parse_args()
+    block_sizes = [size * BitBury.MiB for size in args.block_size]
+
+    if args.image:
+        results = bench_readers(args.image, block_sizes=block_sizes)
+    else:
+        with tempfile.TemporaryDirectory(prefix='bitbury_bench_') as folder:
+            image_path = make_synthetic_image(os.path.join(folder, 'disk.img'), args.size * BitBury.MiB, args.files)
+            # Read the image once so the first run does not pay for a cold page cache
+            with open(image_path, 'rb') as image:
+                while image.read(BitBury.BLOCK_SIZE):
+                    pass
+            results = bench_readers(image_path, block_sizes=block_sizes)
+
+    if args.json:
+        settings = {key: value for key, value in vars(args).items() if key != 'json'}
+        with open(args.json, 'w') as f:
+            json.dump({'settings': settings, 'python': platform.python_version(), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -1,315 +1,857 @@
-import pygame
-from tkinter import messagebox, Tk
-
-# Constants
-WIDTH, HEIGHT = 600, 700  # Increased height for dashboard
-ROWS, COLS = 8, 8
-SQUARE_SIZE = WIDTH // COLS
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-GREEN = (0, 255, 0)
-BLUE = (0, 0, 255)
-RED = (255, 0, 0)
-HIGHLIGHT = (255, 255, 0)
-
-# Piece Representation
-GREEN_PAWN = 'P'
-BLUE_PAWN = 'p'
-EMPTY = '.'
-
-# Initialize Pygame
-pygame.init()
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Pawn Chess Multiplayer")
-FONT = pygame.font.SysFont(None, 40)
-
-# Score Tracking
-score = {GREEN_PAWN: 0, BLUE_PAWN: 0}
-selected_pawn = None
-valid_moves = []
-
-# Load pawn images
-GREEN_PAWN_IMG = pygame.transform.smoothscale(pygame.image.load("green.png"), (SQUARE_SIZE, SQUARE_SIZE))
-BLUE_PAWN_IMG = pygame.transform.smoothscale(pygame.image.load("blue.png"), (SQUARE_SIZE, SQUARE_SIZE))
-# Load logo image
-LOGO_IMG = pygame.transform.smoothscale(pygame.image.load("logo.png"), (180, 90))
-
-def create_board():
-    """Creates an 8x8 chessboard with pawns in their starting positions."""
-    board = [[EMPTY] * COLS for _ in range(ROWS)]
-    for i in range(COLS):
-        board[1][i] = BLUE_PAWN
-        board[6][i] = GREEN_PAWN
-    return board
-
-def draw_dashboard(board):
-    dashboard_rect = pygame.Rect(0, HEIGHT - 100, WIDTH, 100)
-    # Modern gradient background
-    for i in range(100):
-        color = (
-            240 - i, 240 - i//2, 255 - i//4
-        )
-        pygame.draw.rect(WIN, color, (0, HEIGHT - 100 + i, WIDTH, 1))
-    # Soft shadow
-    shadow = pygame.Surface((WIDTH, 100), pygame.SRCALPHA)
-    pygame.draw.rect(shadow, (60,60,90,60), shadow.get_rect(), border_radius=36)
-    WIN.blit(shadow, (0, HEIGHT - 100))
-    stack_font = pygame.font.SysFont("Segoe UI", 38, bold=True)
-    score_text = stack_font.render(f"Green: {score[GREEN_PAWN]}  Blue: {score[BLUE_PAWN]}", True, (40, 40, 80))
-    WIN.blit(score_text, (WIDTH//2 - score_text.get_width()//2, HEIGHT - 80))
-    pygame.draw.rect(WIN, (180, 180, 220), dashboard_rect, border_radius=30, width=4)
-    pygame.draw.rect(WIN, (180, 180, 220), dashboard_rect, border_radius=30, width=4)
-
-def draw_board(board):
-    """Draws the chessboard and highlights valid moves with enhanced visuals."""
-    # Subtle gradient background
-    for y in range(ROWS):
-        for x in range(COLS):
-            square_rect = pygame.Rect(x * SQUARE_SIZE, y * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
-            base = 220 if (x + y) % 2 == 0 else 80
-            grad = int(20 * (y / ROWS))
-            color = (base - grad, base - grad, base + grad)
-            if selected_pawn and (y, x) in [m[1] for m in valid_moves]:
-                color = (255, 255, 180)
-            # Soft shadow for squares
-            shadow = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-            pygame.draw.rect(shadow, (60,60,90,30), shadow.get_rect(), border_radius=12)
-            WIN.blit(shadow, (x * SQUARE_SIZE, y * SQUARE_SIZE + 4))
-            pygame.draw.rect(WIN, color, square_rect, border_radius=10)
-            if selected_pawn and (y, x) == selected_pawn:
-                neon_colors = [
-                    (0, 255, 255, 60),
-                    (0, 255, 128, 80),
-                    (255, 0, 255, 90),
-                    (255, 255, 0, 120),
-                    (255, 255, 255, 200)
-                ]
-                for i, (r, g, b, a) in enumerate(reversed(neon_colors)):
-                    s = pygame.Surface((SQUARE_SIZE - 2 + i*4, SQUARE_SIZE - 2 + i*4), pygame.SRCALPHA)
-                    pygame.draw.ellipse(s, (r, g, b, a), s.get_rect(), 0)
-                    WIN.blit(s, (x * SQUARE_SIZE + 1 - i*2, y * SQUARE_SIZE + 1 - i*2))
-            # Draw pawns
-            if board[y][x] == GREEN_PAWN:
-                WIN.blit(GREEN_PAWN_IMG, (x * SQUARE_SIZE, y * SQUARE_SIZE))
-            elif board[y][x] == BLUE_PAWN:
-                WIN.blit(BLUE_PAWN_IMG, (x * SQUARE_SIZE, y * SQUARE_SIZE))
-            # Move indicator
-            if selected_pawn and (y, x) in [m[1] for m in valid_moves]:
-                pygame.draw.circle(WIN, (255, 140, 0), (x * SQUARE_SIZE + SQUARE_SIZE // 2, y * SQUARE_SIZE + SQUARE_SIZE // 2), SQUARE_SIZE // 5)
-                pygame.draw.circle(WIN, (255, 255, 0), (x * SQUARE_SIZE + SQUARE_SIZE // 2, y * SQUARE_SIZE + SQUARE_SIZE // 2), SQUARE_SIZE // 10)
-    draw_dashboard(board)
-    pygame.display.update()
-
-def get_valid_moves(board, color):
-    """Returns a list of valid moves for pawns of the given color with custom rules (including double-step and en passant)."""
-    moves = []
-    direction = -1 if color == GREEN_PAWN else 1
-    start_row = 6 if color == GREEN_PAWN else 1
-    enemy = BLUE_PAWN if color == GREEN_PAWN else GREEN_PAWN
-    for row in range(ROWS):
-        for col in range(COLS):
-            if board[row][col] == color:
-                new_row = row + direction
-                # Single step
-                if 0 <= new_row < ROWS and board[new_row][col] == EMPTY:
-                    moves.append(((row, col), (new_row, col)))
-                    # Double step from starting position
-                    if row == start_row and board[row + direction][col] == EMPTY and board[row + 2 * direction][col] == EMPTY:
-                        moves.append(((row, col), (row + 2 * direction, col)))
-                # Captures
-                for dcol in (-1, 1):
-                    if 0 <= col + dcol < COLS and 0 <= new_row < ROWS:
-                        if board[new_row][col + dcol] == enemy:
-                            moves.append(((row, col), (new_row, col + dcol)))
-                        # En passant
-                        if row == (3 if color == GREEN_PAWN else 4):
-                            if board[row][col + dcol] == enemy and board[new_row][col + dcol] == EMPTY:
-                                moves.append(((row, col), (new_row, col + dcol)))
-    return moves
-
-def show_warning(message):
-    """Displays a warning message in a popup."""
-    root = Tk()
-    root.withdraw()
-    messagebox.showwarning("Invalid Move", message)
-    root.destroy()
-
-def make_move(board, move, turn):
-    """Updates the board by executing the given move and updates the score. Handles en passant and double-step."""
-    (r1, c1), (r2, c2) = move
-    # En passant
-    if abs(r2 - r1) == 1 and abs(c2 - c1) == 1 and board[r2][c2] == EMPTY:
-        # Remove the captured pawn
-        board[r1][c2] = EMPTY
-    elif board[r2][c2] != EMPTY:
-        score[turn] += 1
-    board[r2][c2], board[r1][c1] = board[r1][c1], EMPTY
-    return BLUE_PAWN if turn == GREEN_PAWN else GREEN_PAWN
-
-def mode_selection_screen():
-    selecting = True
-    mode = None
-    multiplayer_logo = pygame.transform.smoothscale(pygame.image.load("multiplayer.png"), (90, 90))
-    ai_logo = pygame.transform.smoothscale(pygame.image.load("ai.png"), (90, 90))
-    while selecting:
-        for i in range(HEIGHT):
-            color = (255 - i//4, 255 - i//8, 255)
-            pygame.draw.rect(WIN, color, (0, i, WIDTH, 1))
-        WIN.blit(LOGO_IMG, (WIDTH//2 - LOGO_IMG.get_width()//2, 20))
-        title_font = pygame.font.SysFont("Segoe UI", 52, bold=True)
-        title = title_font.render("Pawn Chess", True, (40, 40, 80))
-        WIN.blit(title, (WIDTH//2 - title.get_width()//2, 120))
-        mp_font = pygame.font.SysFont("Segoe UI", 40, bold=True)
-        # Remove text buttons and use logos as buttons
-        mp_rect = multiplayer_logo.get_rect(center=(WIDTH//2 - 100, 250))
-        ai_rect = ai_logo.get_rect(center=(WIDTH//2 + 100, 350))
-        # Draw logos with soft glow
-        mp_logo_glow = pygame.Surface((110,110), pygame.SRCALPHA)
-        pygame.draw.ellipse(mp_logo_glow, (0,255,0,120), mp_logo_glow.get_rect())
-        WIN.blit(mp_logo_glow, mp_rect.topleft)
-        WIN.blit(multiplayer_logo, mp_rect.topleft)
-        ai_logo_glow = pygame.Surface((110,110), pygame.SRCALPHA)
-        pygame.draw.ellipse(ai_logo_glow, (0,100,255,120), ai_logo_glow.get_rect())
-        WIN.blit(ai_logo_glow, ai_rect.topleft)
-        WIN.blit(ai_logo, ai_rect.topleft)
-        pygame.display.update()
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                if mp_rect.inflate(60,28).collidepoint(pos):
-                    mode = "multiplayer"
-                    selecting = False
-                elif ai_rect.inflate(60,28).collidepoint(pos):
-                    mode = "ai"
-                    selecting = False
-                elif ai_rect.inflate(60,28).collidepoint(pos):
-                    mode = "ai"
-                    selecting = False
-    return mode
-
-import copy
-
-def evaluate_board(board, ai_color):
-    # Simple evaluation: material + advancement
-    score_ai = 0
-    score_human = 0
-    for row in range(ROWS):
-        for col in range(COLS):
-            if board[row][col] == ai_color:
-                score_ai += 10
-                # Encourage advancement
-                score_ai += (6-row) if ai_color == GREEN_PAWN else (row-1)
-            elif board[row][col] != EMPTY:
-                score_human += 10
-                score_human += (6-row) if board[row][col] == GREEN_PAWN else (row-1)
-    return score_ai - score_human
-
-def minimax(board, depth, alpha, beta, maximizing, ai_color):
-    enemy = BLUE_PAWN if ai_color == GREEN_PAWN else GREEN_PAWN
-    moves = get_valid_moves(board, ai_color if maximizing else enemy)
-    if depth == 0 or not moves:
-        return evaluate_board(board, ai_color), None
-    best_move = None
-    if maximizing:
-        max_eval = float('-inf')
-        for move in moves:
-            new_board = copy.deepcopy(board)
-            make_move(new_board, move, ai_color)
-            eval, _ = minimax(new_board, depth-1, alpha, beta, False, ai_color)
-            if eval > max_eval:
-                max_eval = eval
-                best_move = move
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break
-        return max_eval, best_move
-    else:
-        min_eval = float('inf')
-        for move in moves:
-            new_board = copy.deepcopy(board)
-            make_move(new_board, move, enemy)
-            eval, _ = minimax(new_board, depth-1, alpha, beta, True, ai_color)
-            if eval < min_eval:
-                min_eval = eval
-                best_move = move
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-        return min_eval, best_move
-
-def main():
-    global selected_pawn, valid_moves, score
-    mode = mode_selection_screen()
-    board = create_board()
-    run, turn = True, GREEN_PAWN
-    winner = None
-    rematch_rect = None
-    ai_color = BLUE_PAWN if mode == "ai" else None
-    while run:
-        draw_board(board)
-        if winner:
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            overlay.fill((30,30,60,200))
-            WIN.blit(overlay, (0,0))
-            win_font = pygame.font.SysFont("Segoe UI", 48, bold=True)
-            win_text = win_font.render(f"{winner} Wins!", True, (255, 80, 80))
-            WIN.blit(win_text, (WIDTH//2 - win_text.get_width()//2, HEIGHT//2 - 60))
-            rematch_font = pygame.font.SysFont("Segoe UI", 40, bold=True)
-            rematch_text = rematch_font.render("Rematch", True, (255,255,255))
-            rematch_rect = rematch_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 10))
-            pygame.draw.rect(WIN, (0, 100, 255), rematch_rect.inflate(60,28), border_radius=16)
-            WIN.blit(rematch_text, rematch_rect)
-            pygame.display.update()
-        pygame.time.delay(100)
-        if mode == "ai" and turn == ai_color and not winner:
-            # AI move
-            _, ai_move = minimax(board, 3, float('-inf'), float('inf'), True, ai_color)
-            if ai_move:
-                turn = make_move(board, ai_move, ai_color)
-                if not get_valid_moves(board, turn):
-                    winner = "Green" if turn == BLUE_PAWN else "Blue"
-            else:
-                winner = "Green" if ai_color == BLUE_PAWN else "Blue"
-            selected_pawn = None
-            valid_moves = []
-            continue
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                if winner:
-                    if rematch_rect and rematch_rect.collidepoint(pos):
-                        board = create_board()
-                        score = {GREEN_PAWN: 0, BLUE_PAWN: 0}
-                        turn = GREEN_PAWN
-                        selected_pawn = None
-                        valid_moves = []
-                        winner = None
-                        continue
-                if pos[1] >= HEIGHT - 100 or winner:
-                    continue
-                col, row = pos[0] // SQUARE_SIZE, pos[1] // SQUARE_SIZE
-                if selected_pawn is None:
-                    if board[row][col] == turn and (mode == "multiplayer" or turn != ai_color):
-                        selected_pawn = (row, col)
-                        valid_moves = [move for move in get_valid_moves(board, turn) if move[0] == selected_pawn]
-                else:
-                    move = (selected_pawn, (row, col))
-                    if move in valid_moves:
-                        turn = make_move(board, move, turn)
-                        if not get_valid_moves(board, turn):
-                            winner = "Green" if turn == BLUE_PAWN else "Blue"
-                    else:
-                        show_warning("Invalid move! Try again.")
-                    selected_pawn = None
-                    valid_moves = []
-    pygame.quit()
-    input("Press Enter to exit...")
-
-if __name__ == "__main__":
-    main()
-
+import time
+import random
+import argparse
+import threading
+import pygame
+from tkinter import messagebox, Tk
+
+# Constants
+WIDTH, HEIGHT = 600, 700  # Increased height for dashboard
+ROWS, COLS = 8, 8
+SQUARE_SIZE = WIDTH // COLS
+BOARD_HEIGHT = ROWS * SQUARE_SIZE  # The dashboard fills the rest of the window
+GLOW_MARGIN = 7  # How far the selection glow reaches past its square
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+RED = (255, 0, 0)
+HIGHLIGHT = (255, 255, 0)
+
+# Piece Representation
+GREEN_PAWN = 'P'
+BLUE_PAWN = 'p'
+EMPTY = '.'
+
+# Bitboards: bit row * 8 + col is set when that square holds a pawn of the board's color
+FULL = (1 << 64) - 1
+FILE_A = 0x0101010101010101  # Column 0
+FILE_H = FILE_A << 7  # Column 7
+RANKS = [0xFF << (8 * row) for row in range(ROWS)]
+THINK_TIME = 1.0  # Seconds the AI may spend on a move
+MAX_DEPTH = 32  # Deepest iteration the AI searches to, whatever the time left
+TABLE_SIZE = 1 << 18  # Transposition table entries, a power of two
+FPS = 60  # Frames drawn per second, also while the AI is thinking
+
+# Zobrist keys: one random 64-bit number per pawn color and square, and one for blue to move
+_zobrist_rng = random.Random(20240601)
+ZOBRIST = {color: [_zobrist_rng.getrandbits(64) for _ in range(ROWS * COLS)] for color in (GREEN_PAWN, BLUE_PAWN)}
+ZOBRIST_BLUE_TO_MOVE = _zobrist_rng.getrandbits(64)
+
+# Initialize Pygame; the window itself is opened by main()
+pygame.init()
+WIN = None
+FONT = pygame.font.SysFont(None, 40)
+TITLE_FONT = pygame.font.SysFont("Segoe UI", 52, bold=True)
+SCORE_FONT = pygame.font.SysFont("Segoe UI", 38, bold=True)
+STATUS_FONT = pygame.font.SysFont("Segoe UI", 24)
+FPS_FONT = pygame.font.SysFont("Segoe UI", 18)
+WINNER_FONT = pygame.font.SysFont("Segoe UI", 48, bold=True)
+BUTTON_FONT = pygame.font.SysFont("Segoe UI", 40, bold=True)
+
+# Pre-rendered static parts of the screen, filled by build_layers()
+LAYERS = {}
+# What draw_board last drew on each square and the dashboard; empty means draw everything
+drawn = {}
+
+# Score Tracking
+score = {GREEN_PAWN: 0, BLUE_PAWN: 0}
+selected_pawn = None
+valid_moves = []
+
+# Load pawn images
+GREEN_PAWN_IMG = pygame.transform.smoothscale(pygame.image.load("green.png"), (SQUARE_SIZE, SQUARE_SIZE))
+BLUE_PAWN_IMG = pygame.transform.smoothscale(pygame.image.load("blue.png"), (SQUARE_SIZE, SQUARE_SIZE))
+# Load logo image
+LOGO_IMG = pygame.transform.smoothscale(pygame.image.load("logo.png"), (180, 90))
+
+def create_board():
+    """Creates an 8x8 chessboard with pawns in their starting positions."""
+    board = [[EMPTY] * COLS for _ in range(ROWS)]
+    for i in range(COLS):
+        board[1][i] = BLUE_PAWN
+        board[6][i] = GREEN_PAWN
+    return board
+
+def gradient_surface(width, height, color_at):
+    """Returns a width x height surface filled a row at a time with color_at(row)."""
+    surface = pygame.Surface((width, height))
+    for i in range(height):
+        pygame.draw.rect(surface, color_at(i), (0, i, width, 1))
+    return surface
+
+def build_layers():
+    """Pre-renders the parts of the screen that never change. Needs the window to be open."""
+    background = gradient_surface(WIDTH, HEIGHT, lambda i: (255 - i//4, 255 - i//8, 255))
+    board = pygame.Surface((WIDTH, BOARD_HEIGHT))
+    board.blit(background, (0, 0))
+    shadow = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+    pygame.draw.rect(shadow, (60,60,90,30), shadow.get_rect(), border_radius=12)
+    for y in range(ROWS):
+        for x in range(COLS):
+            # Subtle gradient background with a soft shadow for each square
+            base = 220 if (x + y) % 2 == 0 else 80
+            grad = int(20 * (y / ROWS))
+            board.blit(shadow, (x * SQUARE_SIZE, y * SQUARE_SIZE + 4))
+            square_rect = pygame.Rect(x * SQUARE_SIZE, y * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+            pygame.draw.rect(board, (base - grad, base - grad, base + grad), square_rect, border_radius=10)
+    highlight = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+    pygame.draw.rect(highlight, (255, 255, 180), highlight.get_rect(), border_radius=10)
+    # Neon rings around the selected pawn, largest first
+    neon_colors = [
+        (0, 255, 255, 60),
+        (0, 255, 128, 80),
+        (255, 0, 255, 90),
+        (255, 255, 0, 120),
+        (255, 255, 255, 200)
+    ]
+    glow = pygame.Surface((SQUARE_SIZE + 2 * GLOW_MARGIN, SQUARE_SIZE + 2 * GLOW_MARGIN), pygame.SRCALPHA)
+    for i, (r, g, b, a) in enumerate(reversed(neon_colors)):
+        ring = pygame.Surface((SQUARE_SIZE - 2 + i*4, SQUARE_SIZE - 2 + i*4), pygame.SRCALPHA)
+        pygame.draw.ellipse(ring, (r, g, b, a), ring.get_rect(), 0)
+        glow.blit(ring, (GLOW_MARGIN + 1 - i*2, GLOW_MARGIN + 1 - i*2))
+    # Modern gradient background for the dashboard
+    dashboard = gradient_surface(WIDTH, 100, lambda i: (240 - i, 240 - i//2, 255 - i//4))
+    shadow = pygame.Surface((WIDTH, 100), pygame.SRCALPHA)
+    pygame.draw.rect(shadow, (60,60,90,60), shadow.get_rect(), border_radius=36)
+    dashboard.blit(shadow, (0, 0))
+    pygame.draw.rect(dashboard, (180, 180, 220), dashboard.get_rect(), border_radius=30, width=4)
+    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    overlay.fill((30,30,60,200))
+    LAYERS.update(background=background.convert(), board=board.convert(), highlight=highlight.convert_alpha(),
+                  glow=glow.convert_alpha(), dashboard=dashboard.convert(), overlay=overlay.convert_alpha())
+
+def redraw_all():
+    """Makes the next draw_board call draw the whole window, e.g. after something was drawn over it."""
+    drawn.clear()
+
+def draw_square(y, x, piece, highlighted, selected):
+    """Draws what sits on top of the static board on one square."""
+    if highlighted:
+        WIN.blit(LAYERS['highlight'], (x * SQUARE_SIZE, y * SQUARE_SIZE))
+    if selected:
+        WIN.blit(LAYERS['glow'], (x * SQUARE_SIZE - GLOW_MARGIN, y * SQUARE_SIZE - GLOW_MARGIN))
+    # Draw pawns
+    if piece == GREEN_PAWN:
+        WIN.blit(GREEN_PAWN_IMG, (x * SQUARE_SIZE, y * SQUARE_SIZE))
+    elif piece == BLUE_PAWN:
+        WIN.blit(BLUE_PAWN_IMG, (x * SQUARE_SIZE, y * SQUARE_SIZE))
+    # Move indicator
+    if highlighted:
+        pygame.draw.circle(WIN, (255, 140, 0), (x * SQUARE_SIZE + SQUARE_SIZE // 2, y * SQUARE_SIZE + SQUARE_SIZE // 2), SQUARE_SIZE // 5)
+        pygame.draw.circle(WIN, (255, 255, 0), (x * SQUARE_SIZE + SQUARE_SIZE // 2, y * SQUARE_SIZE + SQUARE_SIZE // 2), SQUARE_SIZE // 10)
+
+def draw_dashboard(status=None, fps_text=None):
+    """Draws the score, the status line and the FPS counter over the pre-rendered dashboard."""
+    WIN.blit(LAYERS['dashboard'], (0, BOARD_HEIGHT))
+    score_text = SCORE_FONT.render(f"Green: {score[GREEN_PAWN]}  Blue: {score[BLUE_PAWN]}", True, (40, 40, 80))
+    WIN.blit(score_text, (WIDTH//2 - score_text.get_width()//2, HEIGHT - 80))
+    if status:
+        status_text = STATUS_FONT.render(status, True, (80, 80, 120))
+        WIN.blit(status_text, (WIDTH//2 - status_text.get_width()//2, HEIGHT - 38))
+    if fps_text:
+        fps = FPS_FONT.render(fps_text, True, (120, 120, 150))
+        WIN.blit(fps, (WIDTH - fps.get_width() - 24, HEIGHT - 26))
+
+def draw_board(board, status=None, fps_text=None):
+    """Draws the chessboard and highlights valid moves with enhanced visuals. status is shown below the score.
+
+    Only the squares and dashboard text that changed since the last call
+    are drawn, and only those parts of the window are updated.
+    """
+    if not LAYERS:
+        build_layers()
+    targets = [m[1] for m in valid_moves] if selected_pawn else []
+    squares = {(y, x): (board[y][x], (y, x) in targets, (y, x) == selected_pawn)
+               for y in range(ROWS) for x in range(COLS)}
+    full = not drawn
+    if full:
+        WIN.blit(LAYERS['board'], (0, 0))
+        for (y, x), state in squares.items():
+            draw_square(y, x, *state)
+    dirty = []
+    board_rect = pygame.Rect(0, 0, WIDTH, BOARD_HEIGHT)
+    for (y, x), state in squares.items():
+        if full or drawn[(y, x)] == state:
+            continue
+        # Redraw the square with its margin, where the selection glow reaches, and whatever of its neighbours shows there
+        rect = pygame.Rect(x * SQUARE_SIZE, y * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE).inflate(2 * GLOW_MARGIN, 2 * GLOW_MARGIN).clip(board_rect)
+        WIN.set_clip(rect)
+        WIN.blit(LAYERS['board'], rect, rect)
+        for ny in range(max(y - 1, 0), min(y + 2, ROWS)):
+            for nx in range(max(x - 1, 0), min(x + 2, COLS)):
+                draw_square(ny, nx, *squares[(ny, nx)])
+        WIN.set_clip(None)
+        dirty.append(rect)
+    drawn.update(squares)
+    dashboard_state = (score[GREEN_PAWN], score[BLUE_PAWN], status, fps_text)
+    if full or drawn.get('dashboard') != dashboard_state:
+        draw_dashboard(status, fps_text)
+        drawn['dashboard'] = dashboard_state
+        dirty.append(pygame.Rect(0, BOARD_HEIGHT, WIDTH, HEIGHT - BOARD_HEIGHT))
+    if full:
+        pygame.display.update()
+    elif dirty:
+        pygame.display.update(dirty)
+
+def get_valid_moves(board, color):
+    """Returns a list of valid moves for pawns of the given color with custom rules (including double-step and en passant)."""
+    moves = []
+    direction = -1 if color == GREEN_PAWN else 1
+    start_row = 6 if color == GREEN_PAWN else 1
+    enemy = BLUE_PAWN if color == GREEN_PAWN else GREEN_PAWN
+    for row in range(ROWS):
+        for col in range(COLS):
+            if board[row][col] == color:
+                new_row = row + direction
+                # Single step
+                if 0 <= new_row < ROWS and board[new_row][col] == EMPTY:
+                    moves.append(((row, col), (new_row, col)))
+                    # Double step from starting position
+                    if row == start_row and board[row + direction][col] == EMPTY and board[row + 2 * direction][col] == EMPTY:
+                        moves.append(((row, col), (row + 2 * direction, col)))
+                # Captures
+                for dcol in (-1, 1):
+                    if 0 <= col + dcol < COLS and 0 <= new_row < ROWS:
+                        if board[new_row][col + dcol] == enemy:
+                            moves.append(((row, col), (new_row, col + dcol)))
+                        # En passant
+                        if row == (3 if color == GREEN_PAWN else 4):
+                            if board[row][col + dcol] == enemy and board[new_row][col + dcol] == EMPTY:
+                                moves.append(((row, col), (new_row, col + dcol)))
+    return moves
+
+def show_warning(message):
+    """Displays a warning message in a popup."""
+    root = Tk()
+    root.withdraw()
+    messagebox.showwarning("Invalid Move", message)
+    root.destroy()
+
+def apply_move(board, move):
+    """Executes the given move on the board and returns whether it captured. Handles en passant and double-step."""
+    (r1, c1), (r2, c2) = move
+    # En passant
+    if abs(r2 - r1) == 1 and abs(c2 - c1) == 1 and board[r2][c2] == EMPTY:
+        # Remove the captured pawn
+        board[r1][c2] = EMPTY
+        captured = False  # En passant does not score
+    else:
+        captured = board[r2][c2] != EMPTY
+    board[r2][c2], board[r1][c1] = board[r1][c1], EMPTY
+    return captured
+
+def make_move(board, move, turn):
+    """Updates the board by executing the given move and updates the score. Handles en passant and double-step."""
+    if apply_move(board, move):
+        score[turn] += 1
+    return BLUE_PAWN if turn == GREEN_PAWN else GREEN_PAWN
+
+class Position:
+    """The pawns of both colors as two 64-bit bitboards.
+
+    Moves are (from, to) square indices, where a square is row * 8 + col.
+    The move rules match get_valid_moves: single and double steps, diagonal
+    captures, and en passant against any enemy pawn beside a pawn on its
+    fifth row. key is the Zobrist hash of the pawns, kept up to date by
+    make and unmake; hash adds the side to move.
+    """
+    __slots__ = ('green', 'blue', 'key')
+
+    def __init__(self, green=0, blue=0):
+        self.green = green
+        self.blue = blue
+        self.key = 0
+        for color, bits in ((GREEN_PAWN, green), (BLUE_PAWN, blue)):
+            while bits:
+                bit = bits & -bits
+                self.key ^= ZOBRIST[color][bit.bit_length() - 1]
+                bits ^= bit
+
+    @classmethod
+    def from_board(cls, board):
+        green = blue = 0
+        for row in range(ROWS):
+            for col in range(COLS):
+                if board[row][col] == GREEN_PAWN:
+                    green |= 1 << (row * 8 + col)
+                elif board[row][col] == BLUE_PAWN:
+                    blue |= 1 << (row * 8 + col)
+        return cls(green, blue)
+
+    def hash(self, color):
+        """Returns the Zobrist hash of the position with color to move."""
+        return self.key ^ ZOBRIST_BLUE_TO_MOVE if color == BLUE_PAWN else self.key
+
+    def to_board(self):
+        board = [[EMPTY] * COLS for _ in range(ROWS)]
+        for row in range(ROWS):
+            for col in range(COLS):
+                bit = 1 << (row * 8 + col)
+                if self.green & bit:
+                    board[row][col] = GREEN_PAWN
+                elif self.blue & bit:
+                    board[row][col] = BLUE_PAWN
+        return board
+
+    def moves(self, color):
+        """Returns the (from, to) moves of color, captures first."""
+        empty = ~(self.green | self.blue) & FULL
+        if color == GREEN_PAWN:
+            # Green moves towards row 0, so every step is a right shift
+            own, enemy = self.green, self.blue
+            single = (own >> 8) & empty
+            targets = [
+                ((own & ~FILE_A) >> 9) & enemy, 9,
+                ((own & ~FILE_H) >> 7) & enemy, 7,
+                ((own & RANKS[3] & ~FILE_A) >> 9) & empty & (enemy >> 8), 9,  # En passant
+                ((own & RANKS[3] & ~FILE_H) >> 7) & empty & (enemy >> 8), 7,
+                single, 8,
+                ((single & RANKS[5]) >> 8) & empty, 16,
+            ]
+        else:
+            own, enemy = self.blue, self.green
+            single = (own << 8) & empty
+            targets = [
+                ((own & ~FILE_H) << 9) & enemy, -9,
+                ((own & ~FILE_A) << 7) & enemy, -7,
+                ((own & RANKS[4] & ~FILE_H) << 9) & empty & (enemy << 8), -9,  # En passant
+                ((own & RANKS[4] & ~FILE_A) << 7) & empty & (enemy << 8), -7,
+                single, -8,
+                ((single & RANKS[2]) << 8) & empty, -16,
+            ]
+        moves = []
+        for i in range(0, len(targets), 2):
+            bits, offset = targets[i] & FULL, targets[i + 1]
+            while bits:
+                bit = bits & -bits
+                to = bit.bit_length() - 1
+                moves.append((to + offset, to))
+                bits ^= bit
+        return moves
+
+    def make(self, move, color):
+        """Plays move for color in place and returns the undo record for unmake.
+
+        The undo record is the bit of the captured pawn, or 0 when nothing
+        was captured. Nothing outside the position is changed; the score is
+        kept by make_move on the game board only.
+        """
+        start, to = move
+        moved = (1 << start) | (1 << to)
+        if color == GREEN_PAWN:
+            captured = self.blue & (1 << to)
+            if not captured and (start - to) % 8:
+                captured = 1 << (to + 8)  # En passant removes the pawn beside the start square
+            self.blue ^= captured
+            self.green ^= moved
+            enemy = BLUE_PAWN
+        else:
+            captured = self.green & (1 << to)
+            if not captured and (to - start) % 8:
+                captured = 1 << (to - 8)
+            self.green ^= captured
+            self.blue ^= moved
+            enemy = GREEN_PAWN
+        self.key ^= ZOBRIST[color][start] ^ ZOBRIST[color][to]
+        if captured:
+            self.key ^= ZOBRIST[enemy][captured.bit_length() - 1]
+        return captured
+
+    def unmake(self, move, color, captured):
+        """Takes back move, given the undo record returned by make."""
+        start, to = move
+        moved = (1 << start) | (1 << to)
+        if color == GREEN_PAWN:
+            self.green ^= moved
+            self.blue |= captured
+            enemy = BLUE_PAWN
+        else:
+            self.blue ^= moved
+            self.green |= captured
+            enemy = GREEN_PAWN
+        self.key ^= ZOBRIST[color][start] ^ ZOBRIST[color][to]
+        if captured:
+            self.key ^= ZOBRIST[enemy][captured.bit_length() - 1]
+
+EXACT, LOWER, UPPER = 0, 1, 2  # What a stored score is: the value, or a bound on it
+
+class TranspositionTable:
+    """Fixed-size table of search results, indexed by the low bits of the position hash.
+
+    Each slot holds one (key, depth, age, flag, score, move) entry. A new
+    entry replaces the old one if the old one is from an earlier search or
+    was searched no deeper. Call new_search before each AI move.
+    """
+    def __init__(self, size=TABLE_SIZE):
+        self.entries = [None] * size
+        self.mask = size - 1
+        self.age = 0
+        self.probes = self.hits = self.stores = 0
+
+    def new_search(self):
+        self.age += 1
+        self.probes = self.hits = self.stores = 0
+
+    def probe(self, key):
+        """Returns the entry stored for key, or None."""
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        index = key & self.mask
+        old = self.entries[index]
+        if old is None or old[0] == key or old[2] != self.age or old[1] <= depth:
+            self.entries[index] = (key, depth, self.age, flag, score, move)
+            self.stores += 1
+
+    def stats(self):
+        """Returns a one-line summary of the probes and hits since new_search."""
+        rate = self.hits / self.probes * 100 if self.probes else 0.0
+        return f"{self.probes} probes, {self.hits} hits ({rate:.1f}%), {self.stores} stores"
+
+def square_move(move):
+    """Converts a (from, to) square move to the ((row, col), (row, col)) form used by the board."""
+    start, to = move
+    return divmod(start, 8), divmod(to, 8)
+
+def perft(position, color, depth):
+    """Counts the leaf nodes of the move tree of the given depth."""
+    moves = position.moves(color)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    enemy = BLUE_PAWN if color == GREEN_PAWN else GREEN_PAWN
+    total = 0
+    for move in moves:
+        undo = position.make(move, color)
+        total += perft(position, enemy, depth - 1)
+        position.unmake(move, color, undo)
+    return total
+
+def perft_board(board, color, depth):
+    """Counts the same leaf nodes as perft with the list board and get_valid_moves."""
+    moves = get_valid_moves(board, color)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    enemy = BLUE_PAWN if color == GREEN_PAWN else GREEN_PAWN
+    total = 0
+    for move in moves:
+        child = [row[:] for row in board]
+        apply_move(child, move)
+        total += perft_board(child, enemy, depth - 1)
+    return total
+
+def check_move_generation(depth=4, games=200, seed=0):
+    """Checks that the bitboard and list move generators agree, raising AssertionError if they do not.
+
+    Runs perft with both to the given depth from the start position, then
+    plays random games to the end, comparing the moves and the resulting
+    board after every move.
+    """
+    board = create_board()
+    for d in range(1, depth + 1):
+        started = time.perf_counter()
+        nodes = perft(Position.from_board(board), GREEN_PAWN, d)
+        bitboard_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        expected = perft_board(board, GREEN_PAWN, d)
+        board_seconds = time.perf_counter() - started
+        assert nodes == expected, f"perft({d}) is {nodes} with bitboards but {expected} with the board"
+        print(f"perft({d}) = {nodes:>9}  bitboards {bitboard_seconds:7.3f} s  board {board_seconds:7.3f} s")
+    rng = random.Random(seed)
+    for _ in range(games):
+        board, turn = create_board(), GREEN_PAWN
+        position = Position.from_board(board)
+        while True:
+            moves = sorted(get_valid_moves(board, turn))
+            assert sorted(map(square_move, position.moves(turn))) == moves, f"Moves differ in {board}"
+            if not moves:
+                break
+            move = rng.choice(position.moves(turn))
+            position.make(move, turn)
+            apply_move(board, square_move(move))
+            assert position.to_board() == board, f"Boards differ after {square_move(move)}"
+            assert position.key == Position.from_board(board).key, f"Hash differs after {square_move(move)}"
+            turn = BLUE_PAWN if turn == GREEN_PAWN else GREEN_PAWN
+    print(f"{games} random games played to the end with identical moves")
+
+def mode_selection_screen():
+    selecting = True
+    mode = None
+    multiplayer_logo = pygame.transform.smoothscale(pygame.image.load("multiplayer.png"), (90, 90))
+    ai_logo = pygame.transform.smoothscale(pygame.image.load("ai.png"), (90, 90))
+    if not LAYERS:
+        build_layers()
+    # The screen never changes, so it is drawn once and only redrawn when the window is exposed
+    screen = LAYERS['background'].copy()
+    screen.blit(LOGO_IMG, (WIDTH//2 - LOGO_IMG.get_width()//2, 20))
+    title = TITLE_FONT.render("Pawn Chess", True, (40, 40, 80))
+    screen.blit(title, (WIDTH//2 - title.get_width()//2, 120))
+    # Remove text buttons and use logos as buttons
+    mp_rect = multiplayer_logo.get_rect(center=(WIDTH//2 - 100, 250))
+    ai_rect = ai_logo.get_rect(center=(WIDTH//2 + 100, 350))
+    # Draw logos with soft glow
+    mp_logo_glow = pygame.Surface((110,110), pygame.SRCALPHA)
+    pygame.draw.ellipse(mp_logo_glow, (0,255,0,120), mp_logo_glow.get_rect())
+    screen.blit(mp_logo_glow, mp_rect.topleft)
+    screen.blit(multiplayer_logo, mp_rect.topleft)
+    ai_logo_glow = pygame.Surface((110,110), pygame.SRCALPHA)
+    pygame.draw.ellipse(ai_logo_glow, (0,100,255,120), ai_logo_glow.get_rect())
+    screen.blit(ai_logo_glow, ai_rect.topleft)
+    screen.blit(ai_logo, ai_rect.topleft)
+    WIN.blit(screen, (0, 0))
+    pygame.display.update()
+    clock = pygame.time.Clock()
+    while selecting:
+        clock.tick(FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                exit()
+            elif event.type == pygame.VIDEOEXPOSE:
+                WIN.blit(screen, (0, 0))
+                pygame.display.update()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                pos = pygame.mouse.get_pos()
+                if mp_rect.inflate(60,28).collidepoint(pos):
+                    mode = "multiplayer"
+                    selecting = False
+                elif ai_rect.inflate(60,28).collidepoint(pos):
+                    mode = "ai"
+                    selecting = False
+                elif ai_rect.inflate(60,28).collidepoint(pos):
+                    mode = "ai"
+                    selecting = False
+    return mode
+
+def evaluate_board(board, ai_color):
+    # Simple evaluation: material + advancement
+    score_ai = 0
+    score_human = 0
+    for row in range(ROWS):
+        for col in range(COLS):
+            if board[row][col] == ai_color:
+                score_ai += 10
+                # Encourage advancement
+                score_ai += (6-row) if ai_color == GREEN_PAWN else (row-1)
+            elif board[row][col] != EMPTY:
+                score_human += 10
+                score_human += (6-row) if board[row][col] == GREEN_PAWN else (row-1)
+    return score_ai - score_human
+
+def evaluate_position(position, ai_color):
+    """Same evaluation as evaluate_board, counted a row at a time on the bitboards."""
+    green = blue = 0
+    for row in range(ROWS):
+        green += (position.green & RANKS[row]).bit_count() * (10 + 6 - row)
+        blue += (position.blue & RANKS[row]).bit_count() * (10 + row - 1)
+    return green - blue if ai_color == GREEN_PAWN else blue - green
+
+class SearchTimeout(Exception):
+    """Raised inside minimax when the search runs past its deadline."""
+
+class Search:
+    """Move ordering and time keeping for one iterative deepening search.
+
+    Moves are tried in this order: the best move of the previous iteration
+    (or the transposition table's), captures, the two killer moves that
+    last caused a cutoff at the same ply, then the other moves by their
+    history score, which grows each time a move causes a cutoff.
+    """
+    def __init__(self, deadline=float('inf')):
+        self.deadline = deadline
+        self.cancelled = False  # Set from another thread to stop the search
+        self.depth = 0  # Depth of the current iteration
+        self.pv_move = None  # Best root move of the previous iteration
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(MAX_DEPTH + 1)]
+        self.history = {GREEN_PAWN: {}, BLUE_PAWN: {}}
+
+    def count_node(self):
+        self.nodes += 1
+        if not self.nodes & 1023 and (self.cancelled or time.perf_counter() > self.deadline):
+            raise SearchTimeout
+
+    def order(self, moves, color, depth, hint=None):
+        """Returns moves in the order to search them at the given remaining depth."""
+        ply = self.depth - depth
+        if ply == 0 and self.pv_move is not None:
+            hint = self.pv_move
+        captures, quiet = [], []
+        for move in moves:
+            (captures if (move[0] - move[1]) % 8 else quiet).append(move)
+        history = self.history[color]
+        quiet.sort(key=lambda move: history.get(move, 0), reverse=True)
+        for killer in reversed(self.killers[ply]):
+            if killer in quiet:
+                quiet.remove(killer)
+                quiet.insert(0, killer)
+        ordered = captures + quiet
+        if hint in ordered:
+            ordered.remove(hint)
+            ordered.insert(0, hint)
+        return ordered
+
+    def cutoff(self, move, color, depth):
+        """Records that move caused a beta cutoff, for the killer and history heuristics."""
+        if (move[0] - move[1]) % 8:
+            return  # Captures are tried early anyway
+        killers = self.killers[self.depth - depth]
+        if killers[0] != move:
+            killers[1], killers[0] = killers[0], move
+        history = self.history[color]
+        history[move] = history.get(move, 0) + depth * depth
+
+def minimax(position, depth, alpha, beta, maximizing, ai_color, table=None, search=None):
+    """Alpha-beta search of a Position; returns (evaluation, best (from, to) move).
+
+    With a TranspositionTable, positions already searched deep enough are
+    not searched again, and the best move stored for a position is tried
+    first. Stored scores are from ai_color's point of view, so a table must
+    only be shared between searches for the same ai_color. With a Search,
+    moves are ordered by it, and SearchTimeout is raised past its deadline.
+    """
+    enemy = BLUE_PAWN if ai_color == GREEN_PAWN else GREEN_PAWN
+    color = ai_color if maximizing else enemy
+    moves = position.moves(color)
+    if depth == 0 or not moves:
+        return evaluate_position(position, ai_color), None
+    if search is not None:
+        search.count_node()
+    stored_move = None
+    if table is not None:
+        key = position.hash(color)
+        entry = table.probe(key)
+        if entry is not None:
+            _, stored_depth, _, flag, stored_score, stored_move = entry
+            if stored_depth >= depth:
+                if flag == EXACT:
+                    return stored_score, stored_move
+                if flag == LOWER:
+                    alpha = max(alpha, stored_score)
+                else:
+                    beta = min(beta, stored_score)
+                if beta <= alpha:
+                    return stored_score, stored_move
+        alpha_start, beta_start = alpha, beta
+    if search is not None:
+        moves = search.order(moves, color, depth, stored_move)
+    elif stored_move in moves:
+        moves.remove(stored_move)
+        moves.insert(0, stored_move)
+    best_move = None
+    if maximizing:
+        max_eval = float('-inf')
+        for move in moves:
+            undo = position.make(move, color)
+            try:
+                eval, _ = minimax(position, depth-1, alpha, beta, False, ai_color, table, search)
+            finally:
+                # SearchTimeout unwinds through here, and must leave the position as it was
+                position.unmake(move, color, undo)
+            if eval > max_eval:
+                max_eval = eval
+                best_move = move
+            alpha = max(alpha, eval)
+            if beta <= alpha:
+                if search is not None:
+                    search.cutoff(move, color, depth)
+                break
+        if table is not None:
+            store_result(table, key, depth, max_eval, best_move, alpha_start, beta_start)
+        return max_eval, best_move
+    else:
+        min_eval = float('inf')
+        for move in moves:
+            undo = position.make(move, color)
+            try:
+                eval, _ = minimax(position, depth-1, alpha, beta, True, ai_color, table, search)
+            finally:
+                # SearchTimeout unwinds through here, and must leave the position as it was
+                position.unmake(move, color, undo)
+            if eval < min_eval:
+                min_eval = eval
+                best_move = move
+            beta = min(beta, eval)
+            if beta <= alpha:
+                if search is not None:
+                    search.cutoff(move, color, depth)
+                break
+        if table is not None:
+            store_result(table, key, depth, min_eval, best_move, alpha_start, beta_start)
+        return min_eval, best_move
+
+def store_result(table, key, depth, value, move, alpha, beta):
+    """Stores a search result, marked as a bound if it fell outside the (alpha, beta) window it was searched with."""
+    if value <= alpha:
+        flag = UPPER
+    elif value >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table.store(key, depth, flag, value, move)
+
+def iterative_deepening(position, ai_color, think_time=THINK_TIME, table=None, max_depth=MAX_DEPTH, search=None):
+    """Searches one ply deeper at a time until think_time seconds have passed.
+
+    Returns (evaluation, best move, depth) of the deepest iteration that
+    finished. Depth 1 always finishes unless the search is cancelled, so
+    there is a move whenever the AI has one.
+    """
+    started = time.perf_counter()
+    search = search or Search()
+    result = (evaluate_position(position, ai_color), None, 0)
+    for depth in range(1, max_depth + 1):
+        search.depth = depth
+        try:
+            eval, move = minimax(position, depth, float('-inf'), float('inf'), True, ai_color, table, search)
+        except SearchTimeout:
+            break
+        result = (eval, move, depth)
+        if move is None:
+            break  # No moves: the game is over
+        search.pv_move = move
+        search.deadline = started + think_time
+        if search.cancelled or time.perf_counter() > search.deadline:
+            break
+    return result
+
+class SearchWorker:
+    """Runs iterative_deepening on a background thread so the window keeps drawing and handling events.
+
+    search.depth and search.nodes show how far the search has got; result
+    is set once done() returns True.
+    """
+    def __init__(self, position, ai_color, think_time, table):
+        self.search = Search()
+        self.result = None
+        self.thread = threading.Thread(target=self._run, args=(position, ai_color, think_time, table), daemon=True)
+
+    def _run(self, position, ai_color, think_time, table):
+        self.result = iterative_deepening(position, ai_color, think_time, table, search=self.search)
+
+    def start(self):
+        self.thread.start()
+
+    def done(self):
+        return not self.thread.is_alive()
+
+    def cancel(self):
+        """Stops the search and waits for the thread to finish; result should then be ignored."""
+        self.search.cancelled = True
+        self.thread.join()
+
+    def status(self):
+        dots = '.' * (int(time.perf_counter() * 3) % 3 + 1)
+        return f"Thinking{dots:<3} depth {self.search.depth}, {self.search.nodes} nodes"
+
+def main(think_time=THINK_TIME):
+    global WIN, selected_pawn, valid_moves, score
+    WIN = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Pawn Chess Multiplayer")
+    mode = mode_selection_screen()
+    board = create_board()
+    run, turn = True, GREEN_PAWN
+    winner = None
+    rematch_rect = None
+    ai_color = BLUE_PAWN if mode == "ai" else None
+    table = TranspositionTable()
+    worker = None
+    clock = pygame.time.Clock()
+    fps_text, fps_shown = None, 0.0
+    redraw_all()
+    while run:
+        now = time.perf_counter()
+        if now - fps_shown >= 0.5:
+            fps_text, fps_shown = f"{clock.get_fps():.0f} FPS", now
+        if not winner:
+            draw_board(board, worker.status() if worker else None, fps_text)
+        elif rematch_rect is None:
+            # Drawn once over the final position; the screen then stays as it is until the rematch
+            draw_board(board, None, fps_text)
+            WIN.blit(LAYERS['overlay'], (0,0))
+            win_text = WINNER_FONT.render(f"{winner} Wins!", True, (255, 80, 80))
+            WIN.blit(win_text, (WIDTH//2 - win_text.get_width()//2, HEIGHT//2 - 60))
+            rematch_text = BUTTON_FONT.render("Rematch", True, (255,255,255))
+            rematch_rect = rematch_text.get_rect(center=(WIDTH//2, HEIGHT//2 + 10))
+            pygame.draw.rect(WIN, (0, 100, 255), rematch_rect.inflate(60,28), border_radius=16)
+            WIN.blit(rematch_text, rematch_rect)
+            pygame.display.update()
+        clock.tick(FPS)
+        if mode == "ai" and turn == ai_color and not winner:
+            # AI move, searched on a background thread while this loop keeps drawing
+            if worker is None:
+                table.new_search()
+                worker = SearchWorker(Position.from_board(board), ai_color, think_time, table)
+                worker.start()
+            elif worker.done():
+                _, ai_move, depth = worker.result
+                worker = None
+                print(f"AI search: depth {depth}, {table.stats()}")
+                if ai_move:
+                    turn = make_move(board, square_move(ai_move), ai_color)
+                    if not get_valid_moves(board, turn):
+                        winner = "Green" if turn == BLUE_PAWN else "Blue"
+                else:
+                    winner = "Green" if ai_color == BLUE_PAWN else "Blue"
+                selected_pawn = None
+                valid_moves = []
+                continue
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                redraw_all()
+                rematch_rect = None
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                pos = pygame.mouse.get_pos()
+                if winner:
+                    if rematch_rect and rematch_rect.collidepoint(pos):
+                        board = create_board()
+                        score = {GREEN_PAWN: 0, BLUE_PAWN: 0}
+                        turn = GREEN_PAWN
+                        selected_pawn = None
+                        valid_moves = []
+                        winner = None
+                        rematch_rect = None
+                        redraw_all()
+                        continue
+                if pos[1] >= HEIGHT - 100 or winner:
+                    continue
+                col, row = pos[0] // SQUARE_SIZE, pos[1] // SQUARE_SIZE
+                if selected_pawn is None:
+                    if board[row][col] == turn and (mode == "multiplayer" or turn != ai_color):
+                        selected_pawn = (row, col)
+                        valid_moves = [move for move in get_valid_moves(board, turn) if move[0] == selected_pawn]
+                else:
+                    move = (selected_pawn, (row, col))
+                    if move in valid_moves:
+                        turn = make_move(board, move, turn)
+                        if not get_valid_moves(board, turn):
+                            winner = "Green" if turn == BLUE_PAWN else "Blue"
+                    else:
+                        show_warning("Invalid move! Try again.")
+                        redraw_all()
+                    selected_pawn = None
+                    valid_moves = []
+    if worker:
+        worker.cancel()
+    pygame.quit()
+    input("Press Enter to exit...")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pawn Chess")
+    parser.add_argument('--perft', type=int, metavar='DEPTH',
+                        help='Check the bitboard move generator against the board one instead of playing')
+    parser.add_argument('--games', type=int, default=200, help='Random games played by --perft')
+    parser.add_argument('--think-time', type=float, default=THINK_TIME, help='Seconds the AI may spend on a move')
+    args = parser.parse_args()
+    if args.perft:
+        check_move_generation(args.perft, args.games)
+    else:
+        main(args.think_time)
+
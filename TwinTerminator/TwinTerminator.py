@@ -1,41 +1,999 @@
 import os
+import sys
+import csv
+import json
+import math
+import mmap
+import time
+import random
+import shutil
 import hashlib
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import select
+import struct
+import ctypes
+import ctypes.util
+import sqlite3
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from tqdm import tqdm
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
 logging.basicConfig(filename='duplicate_files.log', level=logging.INFO, 
                     format='%(asctime)s %(levelname)s:%(message)s')
 
-def hash_file(file_path):
-    """Generate SHA-256 hash for a file."""
-    hash_algo = hashlib.sha256()
+SAMPLE_SIZE = 4096  # Bytes hashed from each end of a file before committing to a full hash
+CACHE_FILE = 'hash_cache.db'
+CHUNK_SIZE = 1024 * 1024  # Bytes per read when hashing a whole file
+ENGINES = ('buffered', 'mmap')
+HASH_ALGORITHMS = ('sha256', 'blake2b', 'xxhash')
+BACKENDS = ('thread', 'process')
+PLAN_FILE = 'dedupe_plan.json'
+ACTIONS = ('prompt', 'delete', 'hardlink', 'reflink')
+PLAN_FIELDS = ('action', 'original', 'duplicate', 'size', 'mtime_ns',
+               'original_size', 'original_mtime_ns', 'original_dev', 'original_ino')
+PLAN_INT_FIELDS = PLAN_FIELDS[3:]
+FICLONE = 0x40049409  # Linux ioctl that shares the extents of one file with another (reflink)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+IMAGE_HASH_METHODS = ('ahash', 'dhash', 'phash')
+IMAGE_HASH_SIZE = 8  # Side of the bit grid, giving 64-bit perceptual hashes
+POLL_INTERVAL = 60  # Seconds between rescans when inotify is not available
+# inotify event flags (linux/inotify.h)
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_DELETE_SELF = 0x400
+IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x4000, 0x8000, 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+CDC_MIN_SIZE = 16 * 1024  # Content-defined chunk bounds; chunks average CDC_AVG_SIZE bytes
+CDC_AVG_SIZE = 64 * 1024
+CDC_MAX_SIZE = 256 * 1024
+CDC_READ_SIZE = 4 * 1024 * 1024
+_gear_random = random.Random(0x6A09E667)  # Fixed seed so chunk boundaries are stable across runs
+GEAR = [_gear_random.getrandbits(64) for _ in range(256)]
+MASK_64 = (1 << 64) - 1
+WALK_QUEUE_SIZE = 64  # Batches of directory entries buffered between the walker and the hashers
+WALK_BATCH_SIZE = 256
+
+def resolve_algorithm(algorithm):
+    """Return the hash algorithm that will actually be used for the requested one."""
+    if algorithm == 'xxhash' and xxhash is None:
+        logging.warning("xxhash is not installed, falling back to blake2b")
+        return 'blake2b'
+    return algorithm
+
+def new_hasher(algorithm='sha256'):
+    """Create a hash object for one of HASH_ALGORITHMS.
+
+    SHA-256 is cryptographic. blake2b (with a 128-bit digest) and xxhash are
+    much faster but are only used to find candidates that get verified
+    byte-for-byte before anything is done with them.
+    """
+    if algorithm == 'xxhash' and xxhash is not None:
+        return xxhash.xxh3_128()
+    if algorithm in ('blake2b', 'xxhash'):
+        return hashlib.blake2b(digest_size=16)
+    return hashlib.sha256()
+
+def hash_file(file_path, chunk_size=CHUNK_SIZE, engine='buffered', algorithm='sha256'):
+    """Generate a hash for a file (SHA-256 unless another algorithm is given).
+
+    The 'buffered' engine reads into one reused buffer with readinto(), so no
+    new bytes object is allocated per chunk. The 'mmap' engine maps files
+    larger than chunk_size and hashes the mapping in a single call.
+    """
+    hash_algo = new_hasher(algorithm)
     try:
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_algo.update(chunk)
+        with open(file_path, 'rb', buffering=0) as f:
+            if engine == 'mmap' and os.fstat(f.fileno()).st_size > chunk_size:
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        hash_algo.update(mapped)
+                    return hash_algo.hexdigest()
+                except (OSError, ValueError, OverflowError):
+                    # Not mappable (e.g. too large for the address space), read it instead
+                    hash_algo = new_hasher(algorithm)
+            buffer = bytearray(chunk_size)
+            view = memoryview(buffer)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                hash_algo.update(view[:read])
         return hash_algo.hexdigest()
     except Exception as e:
         logging.error(f"Error hashing file {file_path}: {e}")
         return None
 
-def find_duplicates(root_folder, dry_run=False):
-    """Find duplicate files in the given root folder."""
-    hashes = {}
-    duplicates = []
-
-    # Traverse the file system and compute hashes
-    for dirpath, _, filenames in os.walk(root_folder):
-        for filename in filenames:
-            file_path = os.path.join(dirpath, filename)
-            file_hash = hash_file(file_path)
-            if file_hash:
-                if file_hash in hashes:
-                    duplicates.append(file_path)
+def hash_sample(file_path, sample_size=SAMPLE_SIZE, algorithm='sha256'):
+    """Generate a hash of the head and tail of a file (the whole file if it is small)."""
+    hash_algo = new_hasher(algorithm)
+    try:
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= 2 * sample_size:
+                hash_algo.update(f.read())
+            else:
+                hash_algo.update(f.read(sample_size))
+                f.seek(-sample_size, os.SEEK_END)
+                hash_algo.update(f.read(sample_size))
+        return hash_algo.hexdigest()
+    except Exception as e:
+        logging.error(f"Error sampling file {file_path}: {e}")
+        return None
+
+def files_identical(file_pair, chunk_size=CHUNK_SIZE):
+    """Compare two files byte for byte. Takes a (path, path) tuple so it can be mapped like a hash."""
+    first, second = file_pair
+    try:
+        with open(first, 'rb', buffering=0) as f1, open(second, 'rb', buffering=0) as f2:
+            if os.fstat(f1.fileno()).st_size != os.fstat(f2.fileno()).st_size:
+                return False
+            buffer1, buffer2 = bytearray(chunk_size), bytearray(chunk_size)
+            while True:
+                read1 = f1.readinto(buffer1)
+                read2 = f2.readinto(buffer2)
+                if read1 != read2 or buffer1[:read1] != buffer2[:read2]:
+                    return False
+                if not read1:
+                    return True
+    except Exception as e:
+        logging.error(f"Error comparing {first} and {second}: {e}")
+        return False
+
+class ScanStats:
+    """Counters and timings collected while scanning for duplicates."""
+
+    def __init__(self):
+        self.files_scanned = 0
+        self.files_hashed = 0
+        self.bytes_hashed = 0
+        self.stage_times = {}
+
+    def throughput(self):
+        """Return bytes hashed per second of scan time."""
+        seconds = sum(self.stage_times.values())
+        return self.bytes_hashed / seconds if seconds else 0.0
+
+    def to_dict(self):
+        """Return the statistics as a JSON-serialisable dict, with rates per second of scan time."""
+        seconds = sum(self.stage_times.values())
+        return {
+            'files_scanned': self.files_scanned,
+            'files_hashed': self.files_hashed,
+            'bytes_hashed': self.bytes_hashed,
+            'seconds': seconds,
+            'files_per_second': self.files_scanned / seconds if seconds else 0.0,
+            'bytes_per_second': self.throughput(),
+            'stage_seconds': dict(self.stage_times),
+        }
+
+    def summary(self):
+        mib = self.bytes_hashed / (1024 * 1024)
+        return (f"Scanned {self.files_scanned} files, hashed {mib:.1f} MiB in {self.files_hashed} "
+                f"file reads at {self.throughput() / (1024 * 1024):.1f} MiB/s")
+
+class HashCache:
+    """On-disk index of file hashes keyed by (device, inode, size, mtime_ns).
+
+    A file whose key is unchanged since the last run is not hashed again. The
+    path is stored alongside each entry so that prune() can evict entries of
+    files that were deleted or modified.
+    """
+
+    def __init__(self, db_path=CACHE_FILE, rehash=False):
+        self.rehash = rehash
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "dev INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER, kind TEXT, "
+            "digest TEXT NOT NULL, path TEXT NOT NULL, "
+            "PRIMARY KEY (dev, inode, size, mtime_ns, kind))")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS hashes_path ON hashes (path)")
+
+    @staticmethod
+    def key(stat):
+        return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def get(self, stat, kind):
+        """Return the cached digest of an unchanged file, or None."""
+        if self.rehash:
+            self.misses += 1
+            return None
+        row = self.conn.execute(
+            "SELECT digest FROM hashes WHERE dev=? AND inode=? AND size=? AND mtime_ns=? AND kind=?",
+            (*self.key(stat), kind)).fetchone()
+        if row:
+            self.hits += 1
+            return row[0]
+        self.misses += 1
+        return None
+
+    def put_many(self, entries, kind):
+        """Store (path, stat, digest) entries for the given hash kind."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(*self.key(stat), kind, digest, os.path.abspath(file_path)) for file_path, stat, digest in entries])
+        self.conn.commit()
+
+    def prune(self, root_folder):
+        """Evict entries below root_folder whose file was deleted or has changed."""
+        root_folder = os.path.abspath(root_folder)
+        pattern = os.path.join(root_folder, '').replace('%', r'\%').replace('_', r'\_') + '%'
+        rows = self.conn.execute(
+            "SELECT DISTINCT dev, inode, size, mtime_ns, path FROM hashes WHERE path LIKE ? ESCAPE '\\'",
+            (pattern,)).fetchall()
+        stale = []
+        for *key, file_path in rows:
+            try:
+                if self.key(os.stat(file_path)) == tuple(key):
+                    continue
+            except OSError:
+                pass
+            stale.append(key)
+        self.conn.executemany(
+            "DELETE FROM hashes WHERE dev=? AND inode=? AND size=? AND mtime_ns=?", stale)
+        self.conn.commit()
+        logging.info(f"Pruned {len(stale)} stale cache entries below {root_folder}")
+        return len(stale)
+
+    def close(self):
+        self.conn.close()
+
+def walk_files(root_folder):
+    """Yield (path, stat) for every file in the given root folder.
+
+    Uses os.scandir so directory entries carry their file type and no extra
+    stat call is needed to tell files from directories. Symlinked directories
+    are not followed, like os.walk.
+    """
+    pending = [root_folder]
+    while pending:
+        dirpath = pending.pop()
+        try:
+            with os.scandir(dirpath) as entries:
+                subdirs = []
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file():
+                            yield entry.path, entry.stat()
+                    except OSError as e:
+                        logging.error(f"Error reading size of {entry.path}: {e}")
+        except OSError as e:
+            logging.error(f"Error listing directory {dirpath}: {e}")
+            continue
+        # Reversed so that directories are visited in listing order
+        pending.extend(reversed(subdirs))
+
+def stream_files(root_folder, queue_size=WALK_QUEUE_SIZE, batch_size=WALK_BATCH_SIZE):
+    """Walk root_folder in a background thread and yield (path, stat) through a bounded queue."""
+    batches = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def producer():
+        try:
+            batch = []
+            for item in walk_files(root_folder):
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    put(batch)
+                    batch = []
+                    if stop.is_set():
+                        return
+            put(batch)
+        finally:
+            put(done)
+
+    walker = threading.Thread(target=producer, daemon=True)
+    walker.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is done:
+                break
+            yield from batch
+    finally:
+        stop.set()
+
+def serial_map(func, items, total=None):
+    """Yield (item, func(item)) for every item, in order."""
+    for item in items:
+        yield item, func(item)
+
+def hash_batch(hash_func, paths):
+    """Hash a batch of paths in one task, so worker processes receive fewer messages."""
+    return [hash_func(file_path) for file_path in paths]
+
+def bounded_map(executor, func, items, max_in_flight, batch_size=1):
+    """Yield (item, func(item)) in order while keeping at most max_in_flight tasks queued.
+
+    Items are pulled from the iterable only when a slot frees up, so the
+    iterable may be a generator that is still walking the file system.
+    """
+    pending = deque()
+    batch = []
+
+    def submit(batch):
+        pending.append((batch, executor.submit(hash_batch, func, batch)))
+
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            submit(batch)
+            batch = []
+        while len(pending) >= max_in_flight:
+            done_batch, future = pending.popleft()
+            yield from zip(done_batch, future.result())
+    if batch:
+        submit(batch)
+    while pending:
+        done_batch, future = pending.popleft()
+        yield from zip(done_batch, future.result())
+
+def compute_digests(paths, hash_func, kind, stats, map_func=serial_map, cache=None, scan_stats=None,
+                    total=None, read_limit=float('inf')):
+    """Hash the given paths, reusing digests of unchanged files from the cache.
+
+    paths may be a generator; it is consumed lazily as hashing progresses.
+    read_limit is the most bytes hash_func reads per file, for the statistics.
+    """
+    digests = {}
+
+    def missing():
+        for file_path in paths:
+            digest = cache.get(stats[file_path], kind) if cache else None
+            if digest:
+                digests[file_path] = digest
+            else:
+                yield file_path
+
+    computed = []
+    for file_path, digest in map_func(hash_func, missing(), total=total):
+        digests[file_path] = digest
+        if scan_stats:
+            scan_stats.files_hashed += 1
+            scan_stats.bytes_hashed += min(stats[file_path].st_size, read_limit)
+        if cache and digest:
+            computed.append((file_path, stats[file_path], digest))
+            if len(computed) >= 1000:
+                cache.put_many(computed, kind)
+                computed = []
+    if cache and computed:
+        cache.put_many(computed, kind)
+    return digests
+
+def refine_groups(groups, digests):
+    """Split every group of candidate files by digest and keep the groups that still collide."""
+    refined = []
+    for group in groups:
+        buckets = {}
+        for file_path in group:
+            if digests[file_path]:
+                buckets.setdefault(digests[file_path], []).append(file_path)
+        refined.extend(bucket for bucket in buckets.values() if len(bucket) > 1)
+    return refined
+
+def verify_groups(groups, map_func=serial_map):
+    """Drop every file that is not byte-for-byte identical to the first file of its group."""
+    pairs = [(group[0], file_path) for group in groups for file_path in group[1:]]
+    mismatched = {pair[1] for pair, identical in map_func(files_identical, pairs, total=len(pairs)) if not identical}
+    for file_path in mismatched:
+        logging.warning(f"Hash collision: {file_path} differs from the file it matched")
+    verified = [[group[0]] + [p for p in group[1:] if p not in mismatched] for group in groups]
+    return [group for group in verified if len(group) > 1]
+
+def find_duplicate_groups(files, map_func=serial_map, cache=None, hash_func=hash_file, scan_stats=None,
+                          algorithm='sha256', verify=None):
+    """Group files with identical content.
+
+    Files are grouped by size first, then by a head/tail sample hash, and only
+    files that still collide are hashed in full. Each group keeps the walk
+    order, so its first path is the original and the rest are duplicates.
+
+    With a non-cryptographic algorithm the final groups are verified byte for
+    byte (verify defaults to True for anything but SHA-256).
+
+    Sampling starts while files are still being walked: as soon as a second
+    file of some size turns up, both are handed to map_func. Only files that
+    share a size are kept in memory with their stat results.
+    """
+    scan_stats = scan_stats or ScanStats()
+    algorithm = resolve_algorithm(algorithm)
+    if verify is None:
+        verify = algorithm != 'sha256'
+    started = time.perf_counter()
+    first_of_size = {}  # size -> (path, stat) of the only file seen with that size so far
+    by_size = {}  # size -> paths, for sizes shared by more than one file
+    stats = {}
+
+    def size_candidates():
+        for file_path, stat in files:
+            scan_stats.files_scanned += 1
+            size = stat.st_size
+            if size in by_size:
+                by_size[size].append(file_path)
+            elif size in first_of_size:
+                first_path, first_stat = first_of_size.pop(size)
+                stats[first_path] = first_stat
+                by_size[size] = [first_path, file_path]
+                yield first_path
+            else:
+                first_of_size[size] = (file_path, stat)
+                continue
+            stats[file_path] = stat
+            yield file_path
+        scan_stats.stage_times['walk'] = time.perf_counter() - started
+
+    sample_func = partial(hash_sample, algorithm=algorithm)
+    digests = compute_digests(size_candidates(), sample_func, f"{algorithm}:sample:{SAMPLE_SIZE}", stats,
+                              map_func, cache, scan_stats, read_limit=2 * SAMPLE_SIZE)
+    first_of_size.clear()
+    groups = refine_groups(list(by_size.values()), digests)
+    scan_stats.stage_times['sample'] = time.perf_counter() - started - scan_stats.stage_times['walk']
+    logging.info(f"Size stage: {len(stats)} of {scan_stats.files_scanned} files share a size")
+    logging.info(f"Sample stage: {sum(map(len, groups))} files share a head/tail sample")
+
+    # The sample of a small file already covers all of its content
+    started = time.perf_counter()
+    small = [group for group in groups if stats[group[0]].st_size <= 2 * SAMPLE_SIZE]
+    large = [group for group in groups if stats[group[0]].st_size > 2 * SAMPLE_SIZE]
+    paths = [file_path for group in large for file_path in group]
+    digests = compute_digests(paths, partial(hash_func, algorithm=algorithm), algorithm, stats,
+                              map_func, cache, scan_stats, total=len(paths))
+    groups = small + refine_groups(large, digests)
+    scan_stats.stage_times['hash'] = time.perf_counter() - started
+    logging.info(f"Full hash stage: {sum(map(len, groups))} files in {len(groups)} duplicate groups")
+    if verify:
+        started = time.perf_counter()
+        groups = verify_groups(groups, map_func)
+        scan_stats.stage_times['compare'] = time.perf_counter() - started
+        logging.info(f"Verify stage: {sum(map(len, groups))} files confirmed byte for byte")
+    if cache:
+        logging.info(f"Hash cache: {cache.hits} hits, {cache.misses} misses")
+    logging.info(scan_stats.summary())
+    return groups
+
+def _dct_matrix(n, size):
+    """Rows 0..n-1 of the orthogonal DCT-II matrix for the given size."""
+    return [[math.cos(math.pi * (2 * x + 1) * u / (2 * size)) for x in range(size)] for u in range(n)]
+
+def image_hash(file_path, method='dhash', hash_size=IMAGE_HASH_SIZE):
+    """Generate a perceptual hash for an image as a hex string.
+
+    aHash compares pixels with the mean, dHash compares horizontally adjacent
+    pixels, and pHash compares low-frequency DCT coefficients with their
+    median. Visually similar images give hashes with a small Hamming distance.
+    """
+    try:
+        side = hash_size * 4 if method == 'phash' else hash_size
+        width = side + 1 if method == 'dhash' else side
+        with Image.open(file_path) as image:
+            # Let JPEG decode at a reduced scale instead of decoding full size and shrinking
+            image.draft('L', (width * 4, side * 4))
+            pixels = image.convert('L').resize((width, side), Image.LANCZOS).tobytes()
+        if method == 'ahash':
+            mean = sum(pixels) / len(pixels)
+            bits = [pixel > mean for pixel in pixels]
+        elif method == 'dhash':
+            bits = [pixels[row * width + col] > pixels[row * width + col + 1]
+                    for row in range(side) for col in range(hash_size)]
+        else:
+            matrix = _dct_matrix(hash_size, side)
+            rows = [pixels[y * side:(y + 1) * side] for y in range(side)]
+            # Transform rows, then columns, keeping only the low-frequency corner
+            partial_dct = [[sum(c * p for c, p in zip(matrix[u], row)) for u in range(hash_size)] for row in rows]
+            coefficients = [sum(matrix[v][y] * partial_dct[y][u] for y in range(side))
+                            for v in range(hash_size) for u in range(hash_size)]
+            median = sorted(coefficients[1:])[len(coefficients) // 2]  # Ignore the DC term
+            bits = [c > median for c in coefficients]
+        value = 0
+        for bit in bits:
+            value = (value << 1) | bit
+        return f"{value:0{hash_size * hash_size // 4}x}"
+    except Exception as e:
+        logging.error(f"Error hashing image {file_path}: {e}")
+        return None
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes for Hamming-distance lookups.
+
+    A query only descends into children whose edge distance is within
+    max_distance of the query's distance to the node, so most of the tree is
+    skipped instead of comparing against every hash.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, items, {distance: child}]
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """Return the items of every hash within max_distance of value."""
+        found = []
+        pending = [self.root] if self.root else []
+        while pending:
+            node = pending.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                found.extend(node[1])
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    pending.append(child)
+        return found
+
+def group_similar(hashes, max_distance):
+    """Group paths whose hashes are within max_distance of their group's first path.
+
+    hashes is a list of (path, int hash) in walk order. An image joins the
+    nearest earlier group leader within max_distance, or leads a new group.
+    Groups are not chained transitively, so every image in a group is within
+    max_distance of the first path, which is treated as the original.
+    """
+    leaders = BKTree()
+    leader_hashes = []
+    groups = []
+    for file_path, value in hashes:
+        nearest = min(leaders.search(value, max_distance), default=None,
+                      key=lambda index: (hamming_distance(value, leader_hashes[index]), index))
+        if nearest is None:
+            leaders.add(value, len(groups))
+            leader_hashes.append(value)
+            groups.append([file_path])
+        else:
+            groups[nearest].append(file_path)
+    return [group for group in groups if len(group) > 1]
+
+def find_similar_groups(files, map_func=serial_map, cache=None, scan_stats=None, method='dhash', max_distance=5):
+    """Group near-duplicate images (re-encoded or resized copies) by perceptual hash."""
+    scan_stats = scan_stats or ScanStats()
+    started = time.perf_counter()
+    stats = {}
+
+    def images():
+        for file_path, stat in files:
+            scan_stats.files_scanned += 1
+            if file_path.lower().endswith(IMAGE_EXTENSIONS):
+                stats[file_path] = stat
+                yield file_path
+        scan_stats.stage_times['walk'] = time.perf_counter() - started
+
+    hash_func = partial(image_hash, method=method)
+    digests = compute_digests(images(), hash_func, f"{method}:{IMAGE_HASH_SIZE}", stats, map_func, cache, scan_stats)
+    scan_stats.stage_times['hash'] = time.perf_counter() - started - scan_stats.stage_times['walk']
+    started = time.perf_counter()
+    # digests is in completion order, with cached images first; groups must follow the walk order
+    hashes = [(file_path, int(digests[file_path], 16)) for file_path in stats if digests.get(file_path)]
+    groups = group_similar(hashes, max_distance)
+    scan_stats.stage_times['compare'] = time.perf_counter() - started
+    logging.info(f"Perceptual {method}: {len(hashes)} images, {sum(map(len, groups))} in {len(groups)} similar groups")
+    logging.info(scan_stats.summary())
+    return groups
+
+class DuplicateIndex:
+    """Live index of file contents for watch mode.
+
+    Like a scan, files are only hashed once another file of the same size
+    exists. Every update and lookup touches a fixed number of dict entries, so
+    is_duplicate() answers in O(1) however many files are indexed.
+    """
+
+    def __init__(self, hash_func=hash_file, cache=None, kind='sha256'):
+        self.hash_func = hash_func
+        self.cache = cache
+        self.kind = kind
+        self.files = {}  # path -> [stat, digest or None]
+        self.by_size = {}  # size -> set of paths
+        self.by_digest = {}  # digest -> set of paths
+
+    def _hash(self, file_path):
+        entry = self.files[file_path]
+        if entry[1] is not None:
+            return
+        digest = self.cache.get(entry[0], self.kind) if self.cache else None
+        if not digest:
+            digest = self.hash_func(file_path)
+            if digest and self.cache:
+                self.cache.put_many([(file_path, entry[0], digest)], self.kind)
+        if digest:
+            entry[1] = digest
+            self.by_digest.setdefault(digest, set()).add(file_path)
+
+    def update(self, file_path, stat=None):
+        """Add a new file or refresh a changed one."""
+        try:
+            stat = stat or os.stat(file_path)
+        except OSError:
+            self.remove(file_path)
+            return
+        old = self.files.get(file_path)
+        if old and HashCache.key(old[0]) == HashCache.key(stat):
+            return
+        self.remove(file_path)
+        self.files[file_path] = [stat, None]
+        same_size = self.by_size.setdefault(stat.st_size, set())
+        same_size.add(file_path)
+        if len(same_size) > 1:
+            for other in same_size:
+                self._hash(other)
+
+    def remove(self, file_path):
+        entry = self.files.pop(file_path, None)
+        if entry is None:
+            return
+        stat, digest = entry
+        same_size = self.by_size[stat.st_size]
+        same_size.discard(file_path)
+        if not same_size:
+            del self.by_size[stat.st_size]
+        if digest:
+            same_digest = self.by_digest[digest]
+            same_digest.discard(file_path)
+            if not same_digest:
+                del self.by_digest[digest]
+
+    def remove_tree(self, dirpath):
+        """Remove every indexed file below dirpath (a directory was deleted or moved away)."""
+        prefix = os.path.join(dirpath, '')
+        for file_path in [p for p in self.files if p.startswith(prefix)]:
+            self.remove(file_path)
+
+    def duplicates_of(self, file_path):
+        """Return the other indexed paths with the same content as file_path."""
+        entry = self.files.get(file_path)
+        if not entry or not entry[1]:
+            return set()
+        return self.by_digest[entry[1]] - {file_path}
+
+    def is_duplicate(self, file_path):
+        entry = self.files.get(file_path)
+        return bool(entry and entry[1] and len(self.by_digest[entry[1]]) > 1)
+
+    def groups(self):
+        return [sorted(paths) for paths in self.by_digest.values() if len(paths) > 1]
+
+class InotifyWatcher:
+    """Report file changes below a folder through Linux inotify."""
+
+    def __init__(self, root_folder):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # watch descriptor -> directory
+        self.add_tree(root_folder)
+
+    def add_tree(self, dirpath):
+        """Watch dirpath and every directory below it, returning the files found there."""
+        found = []
+        pending = [dirpath]
+        while pending:
+            current = pending.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(current), WATCH_MASK)
+            if wd < 0:
+                logging.error(f"Cannot watch {current}: {os.strerror(ctypes.get_errno())}")
+                continue
+            self.watches[wd] = current
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file():
+                            found.append(entry.path)
+            except OSError as e:
+                logging.error(f"Error listing directory {current}: {e}")
+        return found
+
+    def remove_tree(self, dirpath):
+        prefix = os.path.join(dirpath, '')
+        for wd, path in list(self.watches.items()):
+            if path == dirpath or path.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+
+    def events(self, timeout=1.0):
+        """Yield ('changed' | 'created' | 'deleted' | 'dir_added' | 'dir_removed' | 'overflow', path) tuples."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = struct.unpack_from('iIII', data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b'\0')
+            offset += 16 + length
+            if mask & IN_Q_OVERFLOW:
+                yield 'overflow', None
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            dirpath = self.watches.get(wd)
+            if dirpath is None or not name:
+                continue
+            path = os.path.join(dirpath, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    yield 'dir_added', path
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.remove_tree(path)
+                    yield 'dir_removed', path
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                yield 'deleted', path
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                yield 'changed', path
+            elif mask & IN_CREATE:
+                # Usually followed by IN_CLOSE_WRITE once the content is written
+                yield 'created', path
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Fallback watcher that rescans the folder every interval and reports the differences."""
+
+    def __init__(self, root_folder, interval=POLL_INTERVAL):
+        self.root_folder = root_folder
+        self.interval = interval
+        self.snapshot = {}
+        self.next_scan = time.monotonic() + interval
+
+    def add_tree(self, dirpath):
+        found = []
+        for file_path, stat in walk_files(dirpath):
+            self.snapshot[file_path] = (stat.st_size, stat.st_mtime_ns)
+            found.append(file_path)
+        return found
+
+    def events(self, timeout=1.0):
+        wait = self.next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return
+        time.sleep(max(0, wait))
+        self.next_scan = time.monotonic() + self.interval
+        current = {file_path: (stat.st_size, stat.st_mtime_ns) for file_path, stat in walk_files(self.root_folder)}
+        for file_path in self.snapshot.keys() - current.keys():
+            yield 'deleted', file_path
+        for file_path, key in current.items():
+            if self.snapshot.get(file_path) != key:
+                yield 'changed', file_path
+        self.snapshot = current
+
+    def close(self):
+        pass
+
+def watch_duplicates(root_folder, cache=None, algorithm='sha256', poll_interval=POLL_INTERVAL):
+    """Build a live duplicate index of root_folder and keep it current until interrupted."""
+    algorithm = resolve_algorithm(algorithm)
+    index = DuplicateIndex(partial(hash_file, algorithm=algorithm), cache, kind=algorithm)
+    try:
+        watcher = InotifyWatcher(root_folder)
+        print("Watching for changes with inotify")
+    except (OSError, AttributeError) as e:
+        logging.warning(f"inotify unavailable ({e}), polling every {poll_interval} s instead")
+        watcher = PollingWatcher(root_folder, poll_interval)
+        print(f"Watching for changes by rescanning every {poll_interval} s")
+
+    for file_path in tqdm(watcher.add_tree(root_folder), desc="Indexing", unit=" files"):
+        index.update(file_path)
+    print(f"Indexed {len(index.files)} files, {sum(len(g) - 1 for g in index.groups())} duplicates")
+    try:
+        while True:
+            for event, path in watcher.events():
+                if event == 'overflow':
+                    logging.warning("inotify queue overflowed, rebuilding the index")
+                    for file_path in list(index.files):
+                        index.update(file_path)
+                    for file_path, stat in walk_files(root_folder):
+                        index.update(file_path, stat)
+                elif event == 'dir_added':
+                    for file_path in watcher.add_tree(path):
+                        index.update(file_path)
+                elif event == 'dir_removed':
+                    index.remove_tree(path)
+                elif event == 'deleted':
+                    index.remove(path)
+                elif event == 'created':
+                    index.update(path)
                 else:
-                    hashes[file_hash] = file_path
+                    index.update(path)
+                    if index.is_duplicate(path):
+                        others = ', '.join(sorted(index.duplicates_of(path)))
+                        print(f"Duplicate found: {path} (same as {others})")
+                        logging.info(f"Duplicate found: {path} (same as {others})")
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        watcher.close()
+    return index
+
+def _cdc_masks(avg_size):
+    """FastCDC normalized-chunking masks: a stricter one before avg_size, a looser one after."""
+    bits = max(1, avg_size.bit_length() - 1)
+    # Use the high bits of the gear hash, which depend on the last 64 bytes rather than the last few
+    mask_small = ((1 << (bits + 2)) - 1) << (64 - bits - 2)
+    mask_large = ((1 << (bits - 2)) - 1) << (64 - bits + 2)
+    return mask_small, mask_large
 
-    # Ask for confirmation before deleting each duplicate
+def _cut_point(data, start, end, min_size, avg_size, max_size, mask_small, mask_large):
+    """Return the end of the chunk starting at data[start] (FastCDC with a gear rolling hash)."""
+    length = end - start
+    if length <= min_size:
+        return end
+    limit = start + min(length, max_size)
+    normal = start + min(avg_size, length)
+    gear = GEAR
+    h = 0
+    # Bytes before min_size can never end a chunk, so they are skipped entirely
+    for i in range(start + min_size, normal):
+        h = ((h << 1) + gear[data[i]]) & MASK_64
+        if not h & mask_small:
+            return i + 1
+    for i in range(normal, limit):
+        h = ((h << 1) + gear[data[i]]) & MASK_64
+        if not h & mask_large:
+            return i + 1
+    return limit
+
+def chunk_file(file_path, avg_size=CDC_AVG_SIZE, read_size=CDC_READ_SIZE):
+    """Split a file into content-defined chunks and return a list of (digest, length).
+
+    The file is streamed, so memory stays at about read_size plus one maximum
+    chunk however large the file is. Identical runs of data get identical
+    chunk boundaries even when preceded by inserted or removed bytes.
+    """
+    min_size, max_size = avg_size // 4, avg_size * 4
+    masks = _cdc_masks(avg_size)
+    chunks = []
+    buffer = bytearray()
+    try:
+        with open(file_path, 'rb') as f:
+            eof = False
+            while not eof or buffer:
+                if not eof and len(buffer) < max_size + read_size:
+                    data = f.read(read_size)
+                    buffer += data
+                    eof = not data
+                    continue
+                position = 0
+                # Without eof, stop while a full max_size chunk is still guaranteed to fit
+                while position < len(buffer) and (eof or len(buffer) - position >= max_size):
+                    cut = _cut_point(buffer, position, len(buffer), min_size, avg_size, max_size, *masks)
+                    chunks.append((hashlib.blake2b(buffer[position:cut], digest_size=16).digest(), cut - position))
+                    position = cut
+                del buffer[:position]
+        return chunks
+    except Exception as e:
+        logging.error(f"Error chunking file {file_path}: {e}")
+        return None
+
+def find_chunk_report(files, map_func=serial_map, scan_stats=None, avg_size=CDC_AVG_SIZE, partial_threshold=0.5):
+    """Build a chunk index across the tree and report deduplication per directory.
+
+    Each unique chunk is charged to the directory where it is first seen (in
+    walk order), so the per-directory stored bytes add up to the stored
+    bytes of the whole tree. Files that share at least partial_threshold of
+    their bytes with a single earlier file are reported as partial duplicates.
+    """
+    scan_stats = scan_stats or ScanStats()
+    started = time.perf_counter()
+    index = {}  # chunk digest -> id of the first file containing it
+    directories = {}  # directory -> [logical bytes, stored bytes]
+    file_paths = []
+    partial_duplicates = []
+
+    def paths():
+        for file_path, stat in files:
+            scan_stats.files_scanned += 1
+            yield file_path
+
+    for file_path, chunks in map_func(partial(chunk_file, avg_size=avg_size), paths()):
+        if chunks is None:
+            continue
+        file_id = len(file_paths)
+        file_paths.append(file_path)
+        totals = directories.setdefault(os.path.dirname(file_path), [0, 0])
+        shared = {}
+        size = 0
+        for digest, length in chunks:
+            size += length
+            owner = index.setdefault(digest, file_id)
+            if owner == file_id:
+                totals[1] += length
+            else:
+                shared[owner] = shared.get(owner, 0) + length
+        totals[0] += size
+        scan_stats.files_hashed += 1
+        scan_stats.bytes_hashed += size
+        if shared and size:
+            owner, shared_bytes = max(shared.items(), key=lambda item: item[1])
+            if shared_bytes < size and shared_bytes / size >= partial_threshold:
+                partial_duplicates.append((file_path, file_paths[owner], shared_bytes / size))
+    scan_stats.stage_times['chunk'] = time.perf_counter() - started
+
+    logical = sum(totals[0] for totals in directories.values())
+    stored = sum(totals[1] for totals in directories.values())
+    logging.info(f"Chunk index: {len(index)} unique chunks, {logical} logical bytes, {stored} stored bytes")
+    return {
+        'logical_bytes': logical,
+        'stored_bytes': stored,
+        'unique_chunks': len(index),
+        'directories': {dirpath: {'logical_bytes': totals[0], 'stored_bytes': totals[1]}
+                        for dirpath, totals in directories.items()},
+        'partial_duplicates': partial_duplicates,
+    }
+
+def dedup_ratio(logical_bytes, stored_bytes):
+    return logical_bytes / stored_bytes if stored_bytes else 1.0
+
+def print_chunk_report(report, top=20):
+    """Print the tree-wide and per-directory dedup ratios and the largest partial duplicates."""
+    mib = 1024 * 1024
+    print("\nChunk Dedup Report:")
+    print(f"Logical size: {report['logical_bytes'] / mib:.1f} MiB, after dedup: {report['stored_bytes'] / mib:.1f} MiB, "
+          f"ratio {dedup_ratio(report['logical_bytes'], report['stored_bytes']):.2f}x "
+          f"({report['unique_chunks']} unique chunks)")
+    directories = sorted(report['directories'].items(),
+                         key=lambda item: item[1]['logical_bytes'] - item[1]['stored_bytes'], reverse=True)
+    print(f"\n{'Reclaimable MiB':>16} {'Ratio':>7}  Directory")
+    for dirpath, totals in directories[:top]:
+        reclaimable = totals['logical_bytes'] - totals['stored_bytes']
+        if not reclaimable:
+            break
+        print(f"{reclaimable / mib:16.1f} {dedup_ratio(totals['logical_bytes'], totals['stored_bytes']):6.2f}x  {dirpath}")
+    if report['partial_duplicates']:
+        print("\nPartial duplicates:")
+        for file_path, original, fraction in sorted(report['partial_duplicates'], key=lambda item: -item[2])[:top]:
+            print(f"{fraction:6.1%} of {file_path} is shared with {original}")
+
+def handle_duplicates(duplicates, dry_run=False):
+    """Ask for confirmation before deleting each duplicate and print a summary report."""
+    deleted = 0
     for duplicate in duplicates:
         print(f"Duplicate found: {duplicate}")
         if not dry_run:
@@ -43,6 +1001,7 @@ def find_duplicates(root_folder, dry_run=False):
             if confirm.lower() == 'y':
                 try:
                     os.remove(duplicate)
+                    deleted += 1
                     logging.info(f"Deleted duplicate file: {duplicate}")
                     print(f"Deleted duplicate file: {duplicate}")
                 except Exception as e:
@@ -58,59 +1017,330 @@ def find_duplicates(root_folder, dry_run=False):
     print("\nSummary Report:")
     print(f"Total duplicates found: {len(duplicates)}")
     if not dry_run:
-        print(f"Total duplicates deleted: {sum(1 for d in duplicates if os.path.exists(d))}")
-
-def find_duplicates_multithreaded(root_folder, dry_run=False, num_threads=4):
-    """Find duplicate files using multithreading."""
-    hashes = {}
-    duplicates = []
+        print(f"Total duplicates deleted: {deleted}")
 
-    with ThreadPoolExecutor(max_workers=num_threads) as executor:
-        future_to_file = {executor.submit(hash_file, os.path.join(dirpath, filename)): os.path.join(dirpath, filename)
-                          for dirpath, _, filenames in os.walk(root_folder) for filename in filenames}
+def build_plan(groups, action):
+    """Return one plan entry per duplicate, replacing it by the first file of its group.
 
-        for future in tqdm(as_completed(future_to_file), total=len(future_to_file)):
-            file_path = future_to_file[future]
+    Paths are absolute, so a plan can be applied from any directory. The
+    size and mtime of both files, and the original's device and inode, are
+    recorded so apply_plan can skip entries whose files changed since.
+    """
+    plan = []
+    for original, *duplicates in groups:
+        original = os.path.abspath(original)
+        try:
+            original_stat = os.stat(original)
+        except OSError as e:
+            logging.error(f"Error reading {original} while planning, skipping its group: {e}")
+            continue
+        for duplicate in duplicates:
             try:
-                file_hash = future.result()
-                if file_hash:
-                    if file_hash in hashes:
-                        duplicates.append(file_path)
-                    else:
-                        hashes[file_hash] = file_path
-            except Exception as e:
-                logging.error(f"Error processing file {file_path}: {e}")
-
-    # Ask for confirmation before deleting each duplicate
-    for duplicate in duplicates:
-        print(f"Duplicate found: {duplicate}")
-        if not dry_run:
-            confirm = input("Do you want to delete this duplicate? (y/n): ")
-            if confirm.lower() == 'y':
+                stat = os.stat(duplicate)
+            except OSError as e:
+                logging.error(f"Error reading {duplicate} while planning: {e}")
+                continue
+            if (stat.st_dev, stat.st_ino) == (original_stat.st_dev, original_stat.st_ino):
+                continue  # Already a hardlink of the original
+            plan.append({'action': action, 'original': original, 'duplicate': os.path.abspath(duplicate),
+                         'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                         'original_size': original_stat.st_size, 'original_mtime_ns': original_stat.st_mtime_ns,
+                         'original_dev': original_stat.st_dev, 'original_ino': original_stat.st_ino})
+    return plan
+
+def write_plan(plan, plan_path):
+    """Write the plan as CSV if plan_path ends in .csv, otherwise as JSON."""
+    with open(plan_path, 'w', newline='') as f:
+        if plan_path.lower().endswith('.csv'):
+            writer = csv.DictWriter(f, fieldnames=PLAN_FIELDS)
+            writer.writeheader()
+            writer.writerows(plan)
+        else:
+            json.dump(plan, f, indent=2)
+    logging.info(f"Wrote plan with {len(plan)} entries to {plan_path}")
+
+def load_plan(plan_path):
+    """Read a plan written by write_plan."""
+    with open(plan_path, newline='') as f:
+        if plan_path.lower().endswith('.csv'):
+            plan = list(csv.DictReader(f))
+            for entry in plan:
+                for field in PLAN_INT_FIELDS:
+                    entry[field] = int(entry[field]) if entry.get(field) else None
+            return plan
+        return json.load(f)
+
+def link_file(original, duplicate, action):
+    """Replace duplicate with a hardlink or reflink of original.
+
+    The link is created next to the duplicate under a new, unique temporary
+    name and then renamed over it, so the duplicate path never disappears and
+    no existing file is touched if linking fails.
+    """
+    folder, name = os.path.split(os.path.abspath(duplicate))
+    temp_path = None  # Only set once this call has created the file
+    try:
+        if action == 'hardlink':
+            while temp_path is None:
+                candidate = os.path.join(folder, f"{name}.{os.urandom(4).hex()}.twin-tmp")
                 try:
-                    os.remove(duplicate)
-                    logging.info(f"Deleted duplicate file: {duplicate}")
-                    print(f"Deleted duplicate file: {duplicate}")
-                except Exception as e:
-                    logging.error(f"Error deleting file {duplicate}: {e}")
-                    print(f"Error deleting file {duplicate}: {e}")
-            else:
-                print(f"Skipped deleting: {duplicate}")
-                logging.info(f"Skipped deleting: {duplicate}")
+                    os.link(original, candidate)
+                except FileExistsError:
+                    continue
+                temp_path = candidate
         else:
-            print(f"(Dry run) Skipped deleting: {duplicate}")
+            import fcntl
+            fd, temp_path = tempfile.mkstemp(prefix=f"{name}.", suffix='.twin-tmp', dir=folder)
+            with open(original, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(duplicate, temp_path)
+        os.replace(temp_path, duplicate)
+    except BaseException:
+        if temp_path is not None and os.path.lexists(temp_path):
+            os.remove(temp_path)
+        raise
 
-    # Summary report
+def apply_plan(plan, errors=None):
+    """Apply every entry of a plan and return (applied, bytes_reclaimed).
+
+    Entries whose duplicate or original changed since the plan was written,
+    or whose original is gone, are skipped. So are entries from plans that
+    did not record the original. Failures are logged and printed to stderr,
+    and appended to errors if a list is given.
+    """
+    applied = 0
+    reclaimed = 0
+    for entry in plan:
+        action, original, duplicate = entry['action'], entry['original'], entry['duplicate']
+        try:
+            stat = os.stat(duplicate)
+            if (stat.st_size, stat.st_mtime_ns) != (entry['size'], entry['mtime_ns']):
+                logging.info(f"Skipped {duplicate}: changed since the plan was written")
+                continue
+            # The original is what is kept, so it must be the same file with the same content as when planned
+            original_stat = os.stat(original)
+            if ((original_stat.st_size, original_stat.st_mtime_ns, original_stat.st_dev, original_stat.st_ino) !=
+                    (entry.get('original_size'), entry.get('original_mtime_ns'),
+                     entry.get('original_dev'), entry.get('original_ino'))):
+                logging.info(f"Skipped {duplicate}: original {original} has changed")
+                continue
+            if action == 'delete':
+                os.remove(duplicate)
+            else:
+                link_file(original, duplicate, action)
+            applied += 1
+            reclaimed += stat.st_size
+            logging.info(f"Applied {action} to duplicate file: {duplicate}")
+        except Exception as e:
+            logging.error(f"Error applying {action} to {duplicate}: {e}")
+            print(f"Error applying {action} to {duplicate}: {e}", file=sys.stderr)
+            if errors is not None:
+                errors.append({'action': action, 'duplicate': duplicate, 'error': str(e)})
+    return applied, reclaimed
+
+def build_report(groups, scan_stats=None):
+    """Return a JSON-serialisable report of the duplicate groups and the scan statistics."""
+    plan = build_plan(groups, 'delete')
+    sizes = {entry['duplicate']: entry['size'] for entry in plan}
+    return {
+        'duplicate_groups': [{'original': group[0], 'duplicates': group[1:]} for group in groups],
+        'duplicates_found': sum(len(group) - 1 for group in groups),
+        'bytes_reclaimable': sum(sizes.values()),
+        'stats': scan_stats.to_dict() if scan_stats else None,
+    }
+
+def handle_groups(groups, dry_run=False, action='prompt', plan_path=PLAN_FILE, scan_stats=None, report='text'):
+    """Prompt for each duplicate, or write a plan for the chosen action and apply it in bulk.
+
+    With report='json' a machine-readable report is printed instead of the
+    text output; it includes the outcome of a batch action.
+    """
+    if report == 'json':
+        result = build_report(groups, scan_stats)
+        if action != 'prompt':
+            plan = build_plan(groups, action)
+            write_plan(plan, plan_path)
+            result['plan'] = plan_path
+            if not dry_run:
+                result['errors'] = []
+                result['applied'], result['bytes_reclaimed'] = apply_plan(plan, result['errors'])
+        print(json.dumps(result, indent=2))
+        return result
+    if scan_stats:
+        print(scan_stats.summary())
+    if action == 'prompt':
+        handle_duplicates([file_path for group in groups for file_path in group[1:]], dry_run)
+        return
+    plan = build_plan(groups, action)
+    write_plan(plan, plan_path)
+    print(f"\nPlan with {len(plan)} entries written to {plan_path}")
     print("\nSummary Report:")
-    print(f"Total duplicates found: {len(duplicates)}")
-    if not dry_run:
-        print(f"Total duplicates deleted: {sum(1 for d in duplicates if os.path.exists(d))}")
+    print(f"Total duplicates found: {sum(len(group) - 1 for group in groups)}")
+    if dry_run:
+        print(f"(Dry run) Plan not applied. Reclaimable: {sum(e['size'] for e in plan) / (1024 * 1024):.1f} MiB")
+        return
+    applied, reclaimed = apply_plan(plan)
+    print(f"Total duplicates replaced ({action}): {applied}")
+    print(f"Space reclaimed: {reclaimed / (1024 * 1024):.1f} MiB")
 
-if __name__ == "__main__":
-    root_folder = input("Enter the path of the drive or folder to scan for duplicates: ")
-    if os.path.isdir(root_folder):
-        dry_run = input("Do you want to perform a dry run? (y/n): ").lower() == 'y'
-        num_threads = int(input("Enter the number of threads to use (default 4): ") or 4)
-        find_duplicates_multithreaded(root_folder, dry_run=dry_run, num_threads=num_threads)
+def find_duplicates(root_folder, dry_run=False, cache=None, engine='buffered', chunk_size=CHUNK_SIZE,
+                    action='prompt', plan_path=PLAN_FILE, algorithm='sha256', report='text'):
+    """Find duplicate files in the given root folder."""
+    scan_stats = ScanStats()
+    hash_func = partial(hash_file, chunk_size=chunk_size, engine=engine)
+    groups = find_duplicate_groups(walk_files(root_folder), cache=cache, hash_func=hash_func, scan_stats=scan_stats,
+                                   algorithm=algorithm)
+    return handle_groups(groups, dry_run, action, plan_path, scan_stats, report)
+
+def make_executor(num_threads, backend='thread'):
+    """Return a thread pool, or a process pool whose workers are not forked from this process.
+
+    The walk runs in a thread, and a worker forked while that thread holds a
+    lock (the logging lock, for one) would deadlock on it. Forkserver workers
+    start from a clean single-threaded server process instead.
+    """
+    if backend != 'process':
+        return ThreadPoolExecutor(max_workers=num_threads)
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else None
+    return ProcessPoolExecutor(max_workers=num_threads, mp_context=multiprocessing.get_context(method))
+
+def make_parallel_map(executor, num_threads, backend='thread'):
+    """Return a map function that runs tasks on the executor with a bounded number in flight."""
+    # Worker processes get batches of paths so they are not flooded with tiny messages
+    batch_size = 32 if backend == 'process' else 1
+
+    def parallel_map(func, items, total=None):
+        results = bounded_map(executor, func, items, max_in_flight=num_threads * 4, batch_size=batch_size)
+        return tqdm(results, total=total, desc="Hashing") if total is not None else results
+    return parallel_map
+
+def scan_duplicates(root_folder, num_threads=4, cache=None, engine='buffered', chunk_size=CHUNK_SIZE,
+                    backend='thread', algorithm='sha256', scan_stats=None):
+    """Return the duplicate groups of root_folder, walking and hashing in parallel.
+
+    The directory walk runs in its own thread and feeds a fixed pool of
+    hashing workers through bounded queues, so memory does not grow with
+    pending work and hashing starts before the walk has finished.
+    """
+    hash_func = partial(hash_file, chunk_size=chunk_size, engine=engine)
+    with make_executor(num_threads, backend) as executor:
+        files = tqdm(stream_files(root_folder), desc="Walking", unit=" files")
+        groups = find_duplicate_groups(files, map_func=make_parallel_map(executor, num_threads, backend),
+                                       cache=cache, hash_func=hash_func, scan_stats=scan_stats, algorithm=algorithm)
+        files.close()
+    return groups
+
+def find_duplicates_multithreaded(root_folder, dry_run=False, num_threads=4, cache=None,
+                                  engine='buffered', chunk_size=CHUNK_SIZE, backend='thread',
+                                  action='prompt', plan_path=PLAN_FILE, algorithm='sha256', report='text'):
+    """Find duplicate files using multithreading, or worker processes with backend='process'."""
+    scan_stats = ScanStats()
+    groups = scan_duplicates(root_folder, num_threads, cache, engine, chunk_size, backend, algorithm, scan_stats)
+    return handle_groups(groups, dry_run, action, plan_path, scan_stats, report)
+
+def find_similar_images(root_folder, dry_run=False, num_threads=4, cache=None, backend='thread',
+                        action='prompt', plan_path=PLAN_FILE, method='dhash', max_distance=5, report='text'):
+    """Find near-duplicate images by perceptual hash, hashing images in parallel."""
+    if Image is None:
+        print("Similar image mode needs Pillow: pip install Pillow")
+        return
+    scan_stats = ScanStats()
+    with make_executor(num_threads, backend) as executor:
+        files = tqdm(stream_files(root_folder), desc="Walking", unit=" files")
+        groups = find_similar_groups(files, map_func=make_parallel_map(executor, num_threads, backend),
+                                     cache=cache, scan_stats=scan_stats, method=method, max_distance=max_distance)
+        files.close()
+    return handle_groups(groups, dry_run, action, plan_path, scan_stats, report)
+
+def report_chunk_dedup(root_folder, num_threads=4, avg_size=CDC_AVG_SIZE, report='text'):
+    """Chunk every file in worker processes and print how much content-defined dedup would save."""
+    scan_stats = ScanStats()
+    # Chunking is a pure-Python loop, so it only scales across processes
+    with make_executor(num_threads, 'process') as executor:
+        files = tqdm(stream_files(root_folder), desc="Chunking", unit=" files")
+        result = find_chunk_report(files, map_func=make_parallel_map(executor, num_threads, 'process'),
+                                   scan_stats=scan_stats, avg_size=avg_size)
+        files.close()
+    if report == 'json':
+        print(json.dumps(dict(result, stats=scan_stats.to_dict()), indent=2))
     else:
+        print(scan_stats.summary())
+        print_chunk_report(result)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and delete duplicate files.")
+    parser.add_argument('root_folder', nargs='?', help='Drive or folder to scan (prompted for if omitted)')
+    parser.add_argument('--dry-run', action='store_true', help='List duplicates (or write the plan) without changing anything')
+    parser.add_argument('--action', choices=ACTIONS, default='prompt',
+                        help='Prompt for each duplicate, or delete/hardlink/reflink all of them without prompting')
+    parser.add_argument('--plan', default=PLAN_FILE, help='Where non-interactive actions write their plan (.json or .csv)')
+    parser.add_argument('--report', choices=('text', 'json'), default='text',
+                        help='Print results as text, or as a JSON report with groups, timings and throughput')
+    parser.add_argument('--apply-plan', metavar='PLAN', help='Apply a previously written plan without scanning')
+    parser.add_argument('--mode', choices=('exact', 'similar', 'chunks'), default='exact',
+                        help='Find identical files, visually similar images by perceptual hash, '
+                             'or report the dedup ratio of content-defined chunks')
+    parser.add_argument('--avg-chunk-size', type=int, default=CDC_AVG_SIZE,
+                        help='Average chunk size in bytes for --mode chunks')
+    parser.add_argument('--method', choices=IMAGE_HASH_METHODS, default='dhash', help='Perceptual hash for --mode similar')
+    parser.add_argument('--max-distance', type=int, default=5,
+                        help='Largest Hamming distance (out of 64 bits) at which images count as similar')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and report duplicates as files are created or modified')
+    parser.add_argument('--poll-interval', type=int, default=POLL_INTERVAL,
+                        help='Seconds between rescans in watch mode when inotify is unavailable')
+    parser.add_argument('--threads', type=int, default=4, help='Number of hashing threads or processes')
+    parser.add_argument('--backend', choices=BACKENDS, default='thread', help='Run hashing in threads or processes')
+    parser.add_argument('--engine', choices=ENGINES, default='buffered', help='How files are read while hashing')
+    parser.add_argument('--hash', choices=HASH_ALGORITHMS, default='sha256',
+                        help='Hash algorithm; blake2b and xxhash are faster and matches are verified byte for byte')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Bytes per read when hashing')
+    parser.add_argument('--cache', default=CACHE_FILE, help='Path of the persistent hash cache')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the hash cache')
+    parser.add_argument('--rehash', action='store_true', help='Ignore cached hashes and hash every candidate again')
+    args = parser.parse_args()
+    if args.mode == 'similar' and args.action in ('hardlink', 'reflink'):
+        parser.error("similar images are not identical; use --action prompt or delete with --mode similar")
+    if args.report == 'json' and args.action == 'prompt' and not args.dry_run and args.mode != 'chunks':
+        parser.error("--report json cannot prompt; add --dry-run or choose a batch --action")
+
+    if args.apply_plan:
+        applied, reclaimed = apply_plan(load_plan(args.apply_plan))
+        print(f"Applied {applied} plan entries, reclaimed {reclaimed / (1024 * 1024):.1f} MiB")
+        return
+
+    root_folder = args.root_folder
+    dry_run, num_threads = args.dry_run, args.threads
+    if root_folder is None:
+        root_folder = input("Enter the path of the drive or folder to scan for duplicates: ")
+        if os.path.isdir(root_folder):
+            dry_run = input("Do you want to perform a dry run? (y/n): ").lower() == 'y'
+            num_threads = int(input("Enter the number of threads to use (default 4): ") or 4)
+    if not os.path.isdir(root_folder):
         print("The provided path is not a valid directory.")
+        return
+
+    cache = None if args.no_cache else HashCache(args.cache, rehash=args.rehash)
+    try:
+        if args.watch:
+            watch_duplicates(root_folder, cache=cache, algorithm=args.hash, poll_interval=args.poll_interval)
+        elif args.mode == 'chunks':
+            report_chunk_dedup(root_folder, num_threads=num_threads, avg_size=args.avg_chunk_size, report=args.report)
+        elif args.mode == 'similar':
+            find_similar_images(root_folder, dry_run=dry_run, num_threads=num_threads, cache=cache,
+                                backend=args.backend, action=args.action, plan_path=args.plan,
+                                method=args.method, max_distance=args.max_distance, report=args.report)
+        else:
+            find_duplicates_multithreaded(root_folder, dry_run=dry_run, num_threads=num_threads, cache=cache,
+                                          engine=args.engine, chunk_size=args.chunk_size, backend=args.backend,
+                                          action=args.action, plan_path=args.plan, algorithm=args.hash,
+                                          report=args.report)
+        if cache:
+            cache.prune(root_folder)
+    finally:
+        if cache:
+            cache.close()
+
+if __name__ == "__main__":
+    main()
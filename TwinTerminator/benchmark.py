@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import TwinTerminator
+
+def make_synthetic_tree(root_folder, num_files=200, file_size=4 * 1024 * 1024, duplicate_ratio=0.3,
+                        size_jitter=0.5, seed=0):
+    """Create num_files random files below root_folder, a duplicate_ratio share of them copies of others.
+
+    File sizes vary by up to size_jitter around file_size, so the size stage
+    has something to filter. With size_jitter=0 every file has the same size,
+    which is the worst case for the staged pipeline.
+    """
+    rng = random.Random(seed)
+    originals = []
+    for i in range(num_files):
+        dirpath = os.path.join(root_folder, f"dir{i % 16:02d}")
+        os.makedirs(dirpath, exist_ok=True)
+        file_path = os.path.join(dirpath, f"file{i:06d}.bin")
+        if originals and rng.random() < duplicate_ratio:
+            shutil.copyfile(rng.choice(originals), file_path)
+        else:
+            size = max(1, int(file_size * (1 + rng.uniform(-size_jitter, size_jitter))))
+            with open(file_path, 'wb') as f:
+                f.write(rng.randbytes(size))
+            originals.append(file_path)
+    return root_folder
+
+def bench_algorithms(root_folder, algorithms=TwinTerminator.HASH_ALGORITHMS, engine='buffered',
+                     chunk_size=TwinTerminator.CHUNK_SIZE):
+    """Hash every file below root_folder once per algorithm and return {algorithm: bytes per second}."""
+    files = list(TwinTerminator.walk_files(root_folder))
+    total_bytes = sum(stat.st_size for _, stat in files)
+    results = {}
+    for algorithm in algorithms:
+        resolved = TwinTerminator.resolve_algorithm(algorithm)
+        started = time.perf_counter()
+        for file_path, _ in files:
+            TwinTerminator.hash_file(file_path, chunk_size=chunk_size, engine=engine, algorithm=resolved)
+        elapsed = time.perf_counter() - started
+        results[algorithm] = total_bytes / elapsed if elapsed else 0.0
+        label = algorithm if resolved == algorithm else f"{algorithm} ({resolved})"
+        print(f"{label:<22} {total_bytes / (1024 * 1024):8.1f} MiB in {elapsed:6.2f} s  "
+              f"{results[algorithm] / (1024 * 1024):8.1f} MiB/s")
+    return results
+
+def bench_scans(root_folder, num_threads=4, backends=TwinTerminator.BACKENDS, algorithm='sha256'):
+    """Run the single-threaded scan and the parallel scan per backend, returning their reports.
+
+    The hash cache is not used, so every run hashes the same amount of data.
+    All runs must find the same duplicates; a mismatch raises an error.
+    """
+    runs = {}
+    scan_stats = TwinTerminator.ScanStats()
+    groups = TwinTerminator.find_duplicate_groups(TwinTerminator.walk_files(root_folder),
+                                                  scan_stats=scan_stats, algorithm=algorithm)
+    runs['single'] = TwinTerminator.build_report(groups, scan_stats)
+    for backend in backends:
+        scan_stats = TwinTerminator.ScanStats()
+        groups = TwinTerminator.scan_duplicates(root_folder, num_threads=num_threads, backend=backend,
+                                                algorithm=algorithm, scan_stats=scan_stats)
+        runs[f"{backend} x{num_threads}"] = TwinTerminator.build_report(groups, scan_stats)
+
+    expected = None
+    for name, report in runs.items():
+        found = sorted(sorted([group['original']] + group['duplicates']) for group in report['duplicate_groups'])
+        if expected is None:
+            expected = found
+        elif found != expected:
+            raise RuntimeError(f"{name} scan found different duplicates than the single-threaded scan")
+        stats = report['stats']
+        stages = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in stats['stage_seconds'].items())
+        print(f"{name:<12} {stats['seconds']:7.2f} s {stats['files_per_second']:9.0f} files/s "
+              f"{stats['bytes_per_second'] / (1024 * 1024):8.1f} MiB/s  ({stages})")
+    return runs
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TwinTerminator on a synthetic tree.")
+    parser.add_argument('--files', type=int, default=200, help='Number of files to generate')
+    parser.add_argument('--size', type=int, default=4 * 1024 * 1024, help='Average size of each file in bytes')
+    parser.add_argument('--size-jitter', type=float, default=0.5,
+                        help='How much file sizes vary around --size (0 makes every file the same size)')
+    parser.add_argument('--dup-ratio', type=float, default=0.3, help='Share of files that duplicate another file')
+    parser.add_argument('--engine', choices=TwinTerminator.ENGINES, default='buffered', help='How files are read')
+    parser.add_argument('--threads', type=int, default=4, help='Workers for the parallel scans')
+    parser.add_argument('--root', help='Existing folder to benchmark instead of a generated tree')
+    parser.add_argument('--json', metavar='PATH', help='Also write the results to a JSON file to compare runs')
+    args = parser.parse_args()
+
+    def run(root_folder):
+        print("Hash algorithms:")
+        algorithms = bench_algorithms(root_folder, engine=args.engine)
+        print("\nScans:")
+        scans = bench_scans(root_folder, num_threads=args.threads)
+        return {'algorithms_bytes_per_second': algorithms,
+                'scans': {name: report['stats'] for name, report in scans.items()}}
+
+    if args.root:
+        results = run(args.root)
+    else:
+        with tempfile.TemporaryDirectory(prefix='twin_bench_') as root_folder:
+            make_synthetic_tree(root_folder, args.files, args.size, args.dup_ratio, args.size_jitter)
+            # Read everything once so the first run does not pay for a cold page cache
+            for file_path, _ in TwinTerminator.walk_files(root_folder):
+                TwinTerminator.hash_file(file_path)
+            results = run(root_folder)
+
+    if args.json:
+        settings = {key: value for key, value in vars(args).items() if key != 'json'}
+        with open(args.json, 'w') as f:
+            json.dump({'settings': settings, 'python': platform.python_version(), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+if __name__ == "__main__":
+    main()